@@ -1,13 +1,45 @@
-import subprocess
+import importlib.util
+import multiprocessing
 import os
+import sys
 import pandas as pd
-import glob
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 run_table_scripts = True
 run_second_scripts = True
 
+def fast_rmtree(path):
+    """Recursively delete a directory, unlinking entries in inode order.
+
+    Deleting in inode order rather than directory-listing order keeps the
+    filesystem from seeking back and forth on directories with many files.
+    """
+    with os.scandir(path) as it:
+        entries = sorted(it, key=lambda entry: entry.inode())
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            fast_rmtree(entry.path)
+        else:
+            os.unlink(entry.path)
+    os.rmdir(path)
+
+def delete_item(item):
+    """Delete a single file or directory, returning True if something was deleted."""
+    try:
+        if item.is_file():
+            item.unlink()
+            print(f"Deleted file: {item}")
+            return True
+        elif item.is_dir():
+            fast_rmtree(item)
+            print(f"Deleted directory: {item}")
+            return True
+    except Exception as e:
+        print(f"Error deleting {item}: {e}")
+    return False
+
 def cleanup_folders():
     """Delete all files in specified folders before starting the pipeline."""
     print("Cleaning up folders before starting pipeline...")
@@ -33,19 +65,9 @@ def cleanup_folders():
             print(f"Warning: '{folder_name}' is not a directory.")
             continue
         
-        deleted_count = 0
-        for item in folder_path.iterdir():
-            try:
-                if item.is_file():
-                    item.unlink()
-                    print(f"Deleted file: {item}")
-                    deleted_count += 1
-                elif item.is_dir():
-                    shutil.rmtree(item)
-                    print(f"Deleted directory: {item}")
-                    deleted_count += 1
-            except Exception as e:
-                print(f"Error deleting {item}: {e}")
+        # Deletions are I/O-bound and independent, so issue them from a thread pool
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            deleted_count = sum(executor.map(delete_item, folder_path.iterdir()))
         
         print(f"Total items deleted from {folder_name}: {deleted_count}")
     
@@ -60,23 +82,22 @@ def rename_csv_to_lowercase():
     """Rename all CSV files in source_tables directory to lowercase"""
     source_dir = "source_tables"
     
-    # Get all CSV files in the directory
-    csv_files = glob.glob(os.path.join(source_dir, "*.csv"))
-    
     renamed_count = 0
-    for file_path in csv_files:
-        # Get the directory and filename
-        directory = os.path.dirname(file_path)
-        filename = os.path.basename(file_path)
+    # A single directory scan gives the file names directly; collect the
+    # entries before renaming so renamed files are not seen twice
+    with os.scandir(source_dir) as it:
+        entries = [entry for entry in it if entry.name.endswith(".csv")]
+    
+    for entry in entries:
+        filename = entry.name
         
         # Create lowercase filename
         lowercase_filename = filename.lower()
-        new_file_path = os.path.join(directory, lowercase_filename)
         
         # Only rename if the filename is not already lowercase
         if filename != lowercase_filename:
             try:
-                os.rename(file_path, new_file_path)
+                os.rename(entry.path, os.path.join(source_dir, lowercase_filename))
                 print(f"Renamed: {filename} -> {lowercase_filename}")
                 renamed_count += 1
             except OSError as e:
@@ -111,6 +132,7 @@ table_scripts = [
     "vital_signs--measurement.py"
 ]
 
+# Each second script consumes the output of the one before it, so these run in order
 second_scripts = [
     "combine_subtables.py",
     "add_condition_occurrences.py",
@@ -137,6 +159,44 @@ def transform_table_ids(table_name, input_dir="../combined_omop", output_dir="..
     # ... rest of your code ...
 
 
+def load_script(script_path):
+    """Import an ETL script as a module.
+
+    Script names like aalsdxfx--observation.py are not valid module names, so
+    the file is loaded from its path. The script's directory is put on
+    sys.path so sibling imports (e.g. helpers) resolve as they do when the
+    script is run directly.
+    """
+    script_dir = os.path.dirname(os.path.abspath(script_path))
+    if script_dir not in sys.path:
+        sys.path.insert(0, script_dir)
+
+    module_name = os.path.splitext(os.path.basename(script_path))[0].replace("-", "_")
+    spec = importlib.util.spec_from_file_location(module_name, script_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_script(script_path):
+    """Run a single ETL script's main() in the current interpreter."""
+    print(f"Running {os.path.basename(script_path)}...")
+    load_script(script_path).main()
+
+
+def run_table_scripts_in_parallel(scripts):
+    """Run the table scripts concurrently.
+
+    Each table script reads its own source table and writes its own
+    processed_source file and log, so they have no ordering dependencies.
+    Every script gets a fresh worker process (maxtasksperchild=1) because
+    the table scripts configure their own log file when they are imported.
+    """
+    script_paths = [os.path.join(table_scripts_dir, script) for script in scripts]
+    with multiprocessing.Pool(maxtasksperchild=1) as pool:
+        pool.map(run_script, script_paths, chunksize=1)
+
+
 def copy_omop_reference_files():
     """Copy OMOP reference files from source_tables/omop_tables/ to final_omop/"""
     reference_files = ["concept.csv", "care_site.csv"]
@@ -169,15 +229,10 @@ if __name__ == "__main__":
     print()
 
     if run_table_scripts:
-        for script in table_scripts:
-            script_path = os.path.join(table_scripts_dir, script)
-            print(f"Running {script}...")
-            subprocess.run(["python3", script_path], check=True)
+        run_table_scripts_in_parallel(table_scripts)
     if run_second_scripts:
         for script in second_scripts:
-            script_path = os.path.join(second_scripts_dir, script)
-            print(f"Running {script}...")
-            subprocess.run(["python3", script_path], check=True)
+            run_script(os.path.join(second_scripts_dir, script))
     
     # Step 3: Copy OMOP reference files to final_omop folder
     print("Step 3: Copying OMOP reference files to final_omop folder...")
@@ -1,8 +1,17 @@
 import pandas as pd
+import csv
 import os
+import re
 from pathlib import Path
 import logging
 
+DEMOGRAPHICS_PERSON_FILE = "processed_source/demographics--person.csv"
+
+# Participant_ID inside person_source_value, up to the next " |" separator
+PARTICIPANT_ID_RE = re.compile(
+    r'demographics\+Participant_ID \(participant identifier\): (.+?)(?: \||$)'
+)
+
 NON_ALS_MND_IDS = [
     "CASE-NEUAT520TKK",
     "CASE-NEUAY510EHC",
@@ -21,6 +30,40 @@ HEALTHY_CONTROL_IDS = [
     "CTRL-NEUCV809LL4"
 ]
 
+# Conditions removed from healthy controls: ALS (373182) and 2000000397
+HEALTHY_CONTROL_REMOVED_CONCEPT_IDS = {373182, 2000000397}
+
+def is_healthy_control_removed_concept(concept_id):
+    """Check a raw CSV condition_concept_id value against the concepts removed from healthy controls."""
+    try:
+        return float(concept_id) in HEALTHY_CONTROL_REMOVED_CONCEPT_IDS
+    except ValueError:
+        return False
+
+def resolve_person_ids(participant_ids, person_id_mapping):
+    """Look up person_ids for a list of Participant_IDs, warning about any that are missing."""
+    person_ids = []
+    for participant_id in participant_ids:
+        if participant_id not in person_id_mapping:
+            print(f"Warning: No person_id found for participant {participant_id}")
+            continue
+        person_ids.append(person_id_mapping[participant_id])
+    return person_ids
+
+def build_person_id_map(path=DEMOGRAPHICS_PERSON_FILE):
+    """Build a Participant_ID -> person_id mapping from demographics--person.csv."""
+    demographics_df = pd.read_csv(path, usecols=['person_id', 'person_source_value'])
+    
+    # Extract Participant_ID from person_source_value in a single vectorized pass
+    participant_ids = demographics_df['person_source_value'].str.extract(
+        PARTICIPANT_ID_RE, expand=False
+    )
+    has_participant_id = participant_ids.notna()
+    return dict(zip(
+        participant_ids[has_participant_id],
+        demographics_df.loc[has_participant_id, 'person_id'],
+    ))
+
 def add_condition_occurrences():
     """
     Add condition occurrences for MND, ALS, and healthy controls based on hardcoded ID lists.
@@ -31,53 +74,26 @@ def add_condition_occurrences():
     
     print("Adding condition occurrences based on hardcoded ID lists...")
     
-    # Read demographics--person.csv to get person_id mappings
-    demographics_df = pd.read_csv("processed_source/demographics--person.csv")
-    print(f"Loaded {len(demographics_df)} persons from demographics--person.csv")
-    
-    # Create a mapping from Participant_ID to person_id
-    person_id_mapping = {}
-    for _, row in demographics_df.iterrows():
-        # Extract Participant_ID from person_source_value
-        source_value = row['person_source_value']
-        if 'demographics+Participant_ID (participant identifier): ' in source_value:
-            participant_id = source_value.split('demographics+Participant_ID (participant identifier): ')[1].split(' |')[0]
-            person_id_mapping[participant_id] = row['person_id']
+    # Participant_ID -> person_id mapping from demographics--person.csv
+    person_id_mapping = build_person_id_map()
     
     print(f"Created mapping for {len(person_id_mapping)} participants")
     
-    # Create condition occurrence records
-    condition_records = []
-    
-    # Process Non-ALS MND IDs
-    for participant_id in NON_ALS_MND_IDS:
-        if participant_id not in person_id_mapping:
-            print(f"Warning: No person_id found for participant {participant_id}")
-            continue
-            
-        person_id = person_id_mapping[participant_id]
-        condition_records.append({
-            'person_id': person_id,
-            'condition_concept_id': 374631,
-            'condition_source_value': f'subjects+subject_group_id (disease status): 17 (Non-ALS MND)',
-            'condition_start_date': "1900-01-01",
-            'condition_type_concept_id': 32851,
-        })
+    # Resolve person_ids for the hardcoded Non-ALS MND and ALS ID lists
+    mnd_person_ids = resolve_person_ids(NON_ALS_MND_IDS, person_id_mapping)
+    als_person_ids = resolve_person_ids(ALS_IDS, person_id_mapping)
     
-    # Process ALS IDs
-    for participant_id in ALS_IDS:
-        if participant_id not in person_id_mapping:
-            print(f"Warning: No person_id found for participant {participant_id}")
-            continue
-            
-        person_id = person_id_mapping[participant_id]
-        condition_records.append({
-            'person_id': person_id,
-            'condition_concept_id': 373182,
-            'condition_source_value': f'subjects+subject_group_id (disease status): 1 (ALS)',
-            'condition_start_date': "1900-01-01",
-            'condition_type_concept_id': 32851,
-        })
+    # Create condition occurrence records column-wise; scalar columns are broadcast
+    new_conditions_df = pd.DataFrame({
+        'person_id': mnd_person_ids + als_person_ids,
+        'condition_concept_id': [374631] * len(mnd_person_ids) + [373182] * len(als_person_ids),
+        'condition_source_value': (
+            ['subjects+subject_group_id (disease status): 17 (Non-ALS MND)'] * len(mnd_person_ids) +
+            ['subjects+subject_group_id (disease status): 1 (ALS)'] * len(als_person_ids)
+        ),
+        'condition_start_date': "1900-01-01",
+        'condition_type_concept_id': 32851,
+    })
     
     # Read the combined condition_occurrence table
     combined_file = "combined_omop/condition_occurrence.csv"
@@ -86,38 +102,57 @@ def add_condition_occurrences():
         print(f"Error: {combined_file} not found. Make sure combine_subtables.py has been run first.")
         return
     
+    hc_person_ids = {
+        str(person_id_mapping[participant_id])
+        for participant_id in HEALTHY_CONTROL_IDS
+        if participant_id in person_id_mapping
+    }
+    
+    # Stream the existing records into a temporary file row by row, dropping
+    # healthy-control ALS conditions, then append the new records
     print(f"Reading combined condition_occurrence table from {combined_file}")
-    combined_df = pd.read_csv(combined_file)
-    print(f"Loaded {len(combined_df)} existing condition occurrence records")
+    temp_file = f"{combined_file}.tmp"
+    existing_count = 0
+    kept_count = 0
+    with open(combined_file, newline='') as src, open(temp_file, 'w', newline='') as dst:
+        reader = csv.DictReader(src)
+        fieldnames = list(reader.fieldnames)
+        filter_healthy_controls = 'condition_concept_id' in fieldnames
+        fieldnames += [col for col in new_conditions_df.columns if col not in fieldnames]
+        
+        writer = csv.DictWriter(dst, fieldnames=fieldnames, lineterminator=os.linesep)
+        writer.writeheader()
+        for row in reader:
+            existing_count += 1
+            # For healthy controls, remove ALS conditions if present
+            if (
+                filter_healthy_controls and
+                row['person_id'] in hc_person_ids and
+                is_healthy_control_removed_concept(row['condition_concept_id'])
+            ):
+                continue
+            writer.writerow(row)
+            kept_count += 1
+        
+        # Add new condition records
+        writer.writerows(new_conditions_df.to_dict('records'))
+    
+    os.replace(temp_file, combined_file)
     
-    # For healthy controls, remove ALS conditions if present
-    if 'condition_concept_id' in combined_df.columns:
-        for participant_id in HEALTHY_CONTROL_IDS:
-            if participant_id in person_id_mapping:
-                person_id = person_id_mapping[participant_id]
-                # Remove ALS conditions (373182) and condition 2000000397 for healthy controls
-                combined_df = combined_df[
-                    ~((combined_df['person_id'] == person_id) & 
-                      ((combined_df['condition_concept_id'] == 373182) | 
-                       (combined_df['condition_concept_id'] == 2000000397)))
-                ]
-        print(f"After removing ALS conditions and condition 2000000397 from healthy controls: {len(combined_df)} records")
+    print(f"Loaded {existing_count} existing condition occurrence records")
+    if filter_healthy_controls:
+        print(f"After removing ALS conditions and condition 2000000397 from healthy controls: {kept_count} records")
     
-    # Add new condition records
-    if condition_records:
-        new_conditions_df = pd.DataFrame(condition_records)
+    if not new_conditions_df.empty:
         print(f"Created {len(new_conditions_df)} new condition occurrence records")
-        
-        # Combine with existing records
-        final_conditions_df = pd.concat([combined_df, new_conditions_df], ignore_index=True)
-        print(f"Combined total: {len(final_conditions_df)} condition occurrence records")
+        print(f"Combined total: {kept_count + len(new_conditions_df)} condition occurrence records")
     else:
-        final_conditions_df = combined_df
         print("No new condition occurrence records to add")
     
-    # Save back to combined_omop directory
-    final_conditions_df.to_csv(combined_file, index=False)
     print(f"Updated condition_occurrence table saved to {combined_file}")
 
-if __name__ == "__main__":
+def main():
     add_condition_occurrences()
+
+if __name__ == "__main__":
+    main()
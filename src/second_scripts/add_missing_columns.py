@@ -5,10 +5,31 @@ This script will add the required columns for each table and keep them empty.
 """
 
 import pandas as pd
+import csv
 import os
 import sys
 from pathlib import Path
 
+def append_empty_columns(file_path, new_columns):
+    """
+    Append empty columns to the end of a CSV file by streaming its rows.
+    
+    Values are copied through as text, so nothing is parsed or reformatted.
+    
+    Args:
+        file_path (str): Path to the CSV file
+        new_columns (list): Column names to append
+    """
+    temp_path = f"{file_path}.tmp"
+    empty_values = [''] * len(new_columns)
+    with open(file_path, newline='') as src, open(temp_path, 'w', newline='') as dst:
+        reader = csv.reader(src)
+        writer = csv.writer(dst, lineterminator=os.linesep)
+        writer.writerow(next(reader) + new_columns)
+        for row in reader:
+            writer.writerow(row + empty_values)
+    os.replace(temp_path, file_path)
+
 def add_missing_columns_to_table(file_path, required_columns):
     """
     Add missing columns to a CSV table file.
@@ -18,38 +39,35 @@ def add_missing_columns_to_table(file_path, required_columns):
         required_columns (list): List of required column names
     """
     try:
-        # Read the existing CSV file
-        df = pd.read_csv(file_path)
+        # Read only the header first; the full table is only needed if columns are missing
+        header = pd.read_csv(file_path, nrows=0).columns
         print(f"Processing {file_path}")
-        print(f"Current columns: {list(df.columns)}")
+        print(f"Current columns: {list(header)}")
         
         # Find missing columns
-        existing_columns = set(df.columns)
+        existing_columns = set(header)
         missing_columns = [col for col in required_columns if col not in existing_columns]
         
         if missing_columns:
             print(f"Adding missing columns: {missing_columns}")
             
-            # Add missing columns with empty values
-            for col in missing_columns:
-                df[col] = ''
-            
-            # Reorder columns to match the required order
-            # Keep existing columns in their current order, then add missing ones
-            final_columns = []
-            for col in required_columns:
-                if col in df.columns:
-                    final_columns.append(col)
-            
-            # Add any remaining columns that weren't in required_columns
-            for col in df.columns:
-                if col not in final_columns:
-                    final_columns.append(col)
-            
-            df = df[final_columns]
+            # Required columns first, in the required order, then any other
+            # existing columns in their current order
+            required_set = set(required_columns)
+            final_columns = required_columns + [col for col in header if col not in required_set]
             
-            # Save the updated file
-            df.to_csv(file_path, index=False)
+            if final_columns == list(header) + missing_columns:
+                # Existing columns are already in order and the missing ones all go
+                # at the end, so the rows can be streamed through unchanged
+                append_empty_columns(file_path, missing_columns)
+            else:
+                df = pd.read_csv(file_path)
+                
+                # Add missing columns with empty values and reorder in a single step
+                df = df.reindex(columns=final_columns, fill_value='')
+                
+                # Save the updated file
+                df.to_csv(file_path, index=False)
             print(f"Successfully updated {file_path}")
         else:
             print(f"No missing columns found for {file_path}")
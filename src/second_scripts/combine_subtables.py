@@ -1,5 +1,7 @@
 import pandas as pd
+import numpy as np
 import os
+import shutil
 from pathlib import Path
 import logging
 
@@ -28,17 +30,6 @@ CONCEPT_ID_COLUMNS = {
 
 
 
-def get_concept_info(df, concept_id_col):
-    """Extract concept_id and person_id from a dataframe"""
-    if concept_id_col in df.columns and "person_id" in df.columns:
-        # Convert to integer type
-        df[concept_id_col] = pd.to_numeric(df[concept_id_col], errors="coerce").astype(
-            "Int64"
-        )
-        return df[["person_id", concept_id_col]].drop_duplicates()
-    return pd.DataFrame()
-
-
 def combine_tables():
     # Create output directories
     combined_omop_dir = Path("combined_omop")
@@ -50,13 +41,23 @@ def combine_tables():
     for table_type, priorities in PRIORITIES.items():
         print(f"Processing {table_type}...")
 
-        # Initialize empty DataFrames for combined_omop and redundant data
-        combined_omop_df = pd.DataFrame()
-        redundant_concepts = pd.DataFrame()
+        # Collect the per-file frames and concatenate once at the end
+        combined_frames = []
+        redundant_frames = []
+
+        # (person_id, concept_id) pairs already present in combined_frames
+        seen_keys = set()
 
         # Get the concept_id column name for this table type
         concept_id_col = CONCEPT_ID_COLUMNS[table_type]
 
+        # source_file / existing_source only ever take a handful of values, so
+        # store them as categoricals; a shared dtype keeps them categorical on concat
+        source_file_dtype = pd.CategoricalDtype(
+            [f"{source}--{table_type}.csv" for source in priorities]
+        )
+        existing_source_dtype = pd.CategoricalDtype(["previously_combined_omop"])
+
         # Process files in priority order
         for source in priorities:
             pattern = f"{source}--{table_type}.csv"
@@ -81,47 +82,62 @@ def combine_tables():
                 print(f"Warning: person_id not found in {file_path}")
                 continue
 
-            # Convert concept_id column to integer type
+            # Convert concept_id column to integer type; OMOP concept_ids fit in 32 bits
             df[concept_id_col] = pd.to_numeric(
                 df[concept_id_col], errors="coerce"
-            ).astype("Int64")
+            ).astype("Int32")
 
-            if combined_omop_df.empty:
+            # Downcast the other integer columns to the smallest type that holds them
+            int_cols = df.select_dtypes(include="integer").columns.drop(concept_id_col)
+            df[int_cols] = df[int_cols].apply(pd.to_numeric, downcast="integer")
+
+            # Missing values become None so they match each other, as they would in a merge
+            keys = list(zip(
+                df["person_id"].to_numpy(dtype=object, na_value=None),
+                df[concept_id_col].to_numpy(dtype=object, na_value=None),
+            ))
+
+            if not combined_frames:
                 # First file becomes the base
-                combined_omop_df = df
+                combined_frames.append(df)
+                seen_keys.update(keys)
                 continue
 
-            # Get concepts from current file
-            current_concepts = get_concept_info(df, concept_id_col)
-            current_concepts["source_file"] = file_path.name
-
-            # Find redundant concepts
-            existing_concepts = get_concept_info(
-                combined_omop_df, concept_id_col
+            # Rows whose (person_id, concept_id) already exists in a higher priority file
+            is_redundant = np.fromiter(
+                (key in seen_keys for key in keys), dtype=bool, count=len(keys)
             )
-            existing_concepts["source_file"] = "previously_combined_omop"
 
-            # Merge to find redundant concepts
-            redundant = pd.merge(
-                current_concepts, existing_concepts, on=[concept_id_col, "person_id"], how="inner"
-            )
+            if is_redundant.any():
+                # Record each redundant (person_id, concept_id) pair once
+                redundant_keys = dict.fromkeys(
+                    key for key, dup in zip(keys, is_redundant) if dup
+                )
+                redundant = pd.DataFrame(
+                    list(redundant_keys), columns=["person_id", concept_id_col]
+                )
+                redundant[concept_id_col] = redundant[concept_id_col].astype("Int32")
+                redundant["source_file"] = pd.Series(
+                    file_path.name, index=redundant.index, dtype=source_file_dtype
+                )
+                redundant["existing_source"] = pd.Series(
+                    "previously_combined_omop", index=redundant.index, dtype=existing_source_dtype
+                )
 
-            if not redundant.empty:
                 # Add to redundant concepts
-                redundant_concepts = pd.concat([redundant_concepts, redundant])
+                redundant_frames.append(redundant)
 
                 # Remove redundant rows from current dataframe (person-specific)
-                # Create a composite key for comparison
-                redundant_keys = redundant[["person_id", concept_id_col]].drop_duplicates()
-                df_keys = df[["person_id", concept_id_col]].drop_duplicates()
-                
-                # Remove rows where both person_id and concept_id match
-                df = df[~df.set_index(["person_id", concept_id_col]).index.isin(
-                    redundant_keys.set_index(["person_id", concept_id_col]).index
-                )]
+                df = df[~is_redundant]
+
+            seen_keys.update(key for key, dup in zip(keys, is_redundant) if not dup)
 
             # Combine with existing data
-            combined_omop_df = pd.concat([combined_omop_df, df], ignore_index=True)
+            combined_frames.append(df)
+
+        combined_omop_df = (
+            pd.concat(combined_frames, ignore_index=True) if combined_frames else pd.DataFrame()
+        )
 
         # Save combined_omop table
         output_file = combined_omop_dir / f"{table_type}.csv"
@@ -129,27 +145,17 @@ def combine_tables():
         print(f"Saved combined_omop {table_type} to {output_file}")
 
         # Save redundant concepts if any
-        if not redundant_concepts.empty:
-            # Clean up redundant concepts DataFrame
-            redundant_concepts = redundant_concepts.rename(
-                columns={
-                    f"{concept_id_col}_x": concept_id_col,
-                    "source_file_x": "source_file",
-                    "source_file_y": "existing_source",
-                    "person_id_x": "person_id",
-                }
-            )
+        if redundant_frames:
+            redundant_concepts = pd.concat(redundant_frames)
 
             # Add additional information
             redundant_concepts["table_type"] = table_type
-            redundant_concepts["priority_order"] = redundant_concepts[
-                "source_file"
-            ].apply(
-                lambda x: (
-                    priorities.index(x.split("--")[0])
-                    if x != "previously_combined_omop"
-                    else -1
-                )
+            priority_order_map = {
+                f"{source}--{table_type}.csv": i for i, source in enumerate(priorities)
+            }
+            priority_order_map["previously_combined_omop"] = -1
+            redundant_concepts["priority_order"] = (
+                redundant_concepts["source_file"].map(priority_order_map).astype("int8")
             )
 
             redundant_file = redundant_dir / f"{table_type}_redundant.csv"
@@ -166,16 +172,21 @@ def combine_tables():
 
         if table_type not in PRIORITIES:  # Only process tables without priorities
             print(f"Processing {table_type}...")
-            df = pd.read_csv(file)
+            # Nothing to combine, so copy the file as-is instead of parsing and rewriting it
             output_file = combined_omop_dir / f"{table_type}.csv"
-            df.to_csv(output_file, index=False)
+            shutil.copyfile(file, output_file)
             print(f"Saved {table_type} to {output_file}")
 
 
-if __name__ == "__main__":
+def main():
     logging.basicConfig(
         filename="logs/combine_subtables.log",
         level=logging.INFO,
         format="%(asctime)s - %(levelname)s - %(message)s",
+        force=True,
     )
     combine_tables()
+
+
+if __name__ == "__main__":
+    main()
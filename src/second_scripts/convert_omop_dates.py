@@ -1,20 +1,7 @@
 import pandas as pd
 import os
-from datetime import datetime
 import glob
-
-
-def convert_date(date_str):
-    """Convert date from dd/mm/yyyy to yyyy-mm-dd format"""
-    if pd.isna(date_str) or date_str == "":
-        return date_str
-    try:
-        # Try parsing as dd/mm/yyyy
-        date_obj = datetime.strptime(str(date_str), "%d/%m/%Y")
-        return date_obj.strftime("%Y-%m-%d")
-    except ValueError:
-        # If it's already in yyyy-mm-dd format or invalid, return as is
-        return date_str
+from concurrent.futures import ProcessPoolExecutor
 
 
 def process_file(file_path):
@@ -33,7 +20,14 @@ def process_file(file_path):
 
     # Convert dates in each date column
     for col in date_columns:
-        df[col] = df[col].apply(convert_date)
+        # Numeric columns cannot hold dd/mm/yyyy strings
+        if pd.api.types.is_numeric_dtype(df[col]):
+            continue
+        # Parse the whole column at once; values that are not dd/mm/yyyy
+        # (already yyyy-mm-dd, blank or invalid) become NaT and are kept as is
+        parsed = pd.to_datetime(df[col].astype(str), format="%d/%m/%Y", errors="coerce")
+        if parsed.notna().any():
+            df[col] = parsed.dt.strftime("%Y-%m-%d").where(parsed.notna(), df[col])
 
     # Save the modified file
     output_path = file_path
@@ -45,8 +39,9 @@ def main():
     # Get all CSV files in the processed_source directory
     omop_files = glob.glob("processed_source/*.csv")
 
-    for file_path in omop_files:
-        process_file(file_path)
+    # Files are independent, so convert them in parallel across CPU cores
+    with ProcessPoolExecutor() as executor:
+        list(executor.map(process_file, omop_files))
 
 
 if __name__ == "__main__":
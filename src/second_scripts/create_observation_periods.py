@@ -1,10 +1,14 @@
 import pandas as pd
+import numpy as np
 import os
 import logging
 from datetime import datetime
 
-logging.basicConfig(level=logging.INFO)
+# OMOP tables store dates as YYYY-MM-DD
+OMOP_DATE_FORMAT = '%Y-%m-%d'
 
+# Placeholder date (01-01-1900) used when the real date is unknown
+PLACEHOLDER_DATE = np.datetime64('1900-01-01', 'ns')
 
 def get_date_columns(df):
     """Get all date columns from a dataframe"""
@@ -15,29 +19,10 @@ def get_date_columns(df):
     return date_columns
 
 
-def is_valid_date(date_val):
-    """Check if a date is valid and not a placeholder (01-01-1900)"""
-    if pd.isna(date_val):
-        return False
-    
-    try:
-        # Convert to datetime if it's not already
-        if not isinstance(date_val, datetime):
-            date_val = pd.to_datetime(date_val)
-        
-        # Filter out 01-01-1900 placeholder date
-        if date_val == datetime(1900, 1, 1):
-            return False
-            
-        return True
-        
-    except Exception:
-        return False
-
-
-def get_person_date_range(person_id, tables):
-    """Get the earliest and latest dates for a specific person across all tables"""
-    all_dates = []
+def get_person_date_ranges(tables):
+    """Get the earliest and latest dates for every person across all tables"""
+    # Valid (person_id, date) pairs from every date column of every table
+    person_dates = []
     
     for table in tables:
         try:
@@ -46,38 +31,56 @@ def get_person_date_range(person_id, tables):
             if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
                 continue
             
-            df = pd.read_csv(file_path, low_memory=False)
+            # Read the header first so only person_id and the date columns are loaded
+            header_df = pd.read_csv(file_path, nrows=0)
+            if 'person_id' not in header_df.columns:
+                continue
             
-            if df.empty or 'person_id' not in df.columns:
+            date_columns = get_date_columns(header_df)
+            if not date_columns:
                 continue
             
-            # Filter data for this person and create a copy to avoid warnings
-            person_data = df[df['person_id'] == person_id].copy()
+            df = pd.read_csv(file_path, usecols=['person_id'] + date_columns, low_memory=False)
             
-            if person_data.empty:
+            if df.empty:
                 continue
             
-            # Get all date columns
-            date_columns = get_date_columns(person_data)
-            
+            table_dates = []
             for col in date_columns:
-                # Convert column to datetime, ignoring errors
-                person_data[col] = pd.to_datetime(person_data[col], errors='coerce')
+                # Convert column to datetime, ignoring errors. exact=False lets
+                # datetime values with a trailing time parse to their date
+                dates = pd.to_datetime(
+                    df[col], errors='coerce', format=OMOP_DATE_FORMAT, exact=False, cache=True
+                )
                 
-                # Filter out invalid dates
-                valid_dates = person_data[col][person_data[col].apply(is_valid_date)]
-                
-                if not valid_dates.empty:
-                    all_dates.extend(valid_dates.tolist())
+                # Keep only valid dates, filtering out the 01-01-1900 placeholder
+                valid = dates.notna().to_numpy() & (dates.to_numpy() != PLACEHOLDER_DATE)
+                if not valid.any():
+                    continue
+                table_dates.append(pd.DataFrame({
+                    'person_id': df['person_id'][valid],
+                    'date': dates[valid]
+                }))
+            
+            person_dates.extend(table_dates)
                     
         except Exception as e:
-            logging.debug(f"Error processing {table} for person {person_id}: {str(e)}")
+            logging.debug(f"Error processing {table}: {str(e)}")
             continue
     
-    if not all_dates:
-        return None, None
+    if not person_dates:
+        return pd.DataFrame({
+            'start_date': pd.Series(dtype='datetime64[ns]'),
+            'end_date': pd.Series(dtype='datetime64[ns]')
+        })
     
-    return min(all_dates), max(all_dates)
+    # One groupby over the long (person_id, date) frame gives every person's
+    # range; persons without any valid date do not appear
+    grouped = pd.concat(person_dates, ignore_index=True).groupby('person_id')['date']
+    return pd.DataFrame({
+        'start_date': grouped.min(),
+        'end_date': grouped.max()
+    })
 
 
 def create_observation_periods():
@@ -97,61 +100,47 @@ def create_observation_periods():
     
     # Read person table to get all person_ids
     try:
-        person_df = pd.read_csv("combined_omop/person.csv")
+        # Only person_id is needed from the person table
+        person_df = pd.read_csv("combined_omop/person.csv", usecols=["person_id"])
         if person_df.empty:
             logging.error("Person table is empty")
             return
         
         logging.info(f"Found {len(person_df)} persons")
         
-        # Create observation periods for each person
-        observation_periods = []
-        valid_periods = 0
-        default_periods = 0
+        # Read every table once and collect the date range of each person
+        date_ranges = get_person_date_ranges(tables)
         
-        for idx, person_row in person_df.iterrows():
-            person_id = person_row['person_id']
-            
-            # Get individual date range for this person
-            earliest_date, latest_date = get_person_date_range(person_id, tables)
-            
-            if earliest_date and latest_date:
-                observation_periods.append({
-                    'observation_period_id': idx + 1,
-                    'person_id': person_id,
-                    'observation_period_start_date': earliest_date.strftime('%Y-%m-%d'),
-                    'observation_period_end_date': latest_date.strftime('%Y-%m-%d'),
-                    'period_type_concept_id': 32851  # Standard observation period
-                })
-                valid_periods += 1
-                
-                if valid_periods % 100 == 0:
-                    logging.info(f"Processed {valid_periods} persons...")
-            else:
-                # Use default date range for persons with no valid dates
-                default_start = datetime(2016, 1, 1)
-                default_end = datetime(2016, 1, 1)
-                
-                observation_periods.append({
-                    'observation_period_id': idx + 1,
-                    'person_id': person_id,
-                    'observation_period_start_date': default_start.strftime('%Y-%m-%d'),
-                    'observation_period_end_date': default_end.strftime('%Y-%m-%d'),
-                    'period_type_concept_id': 32851  # Standard observation period
-                })
-                default_periods += 1
-                logging.info(f"No valid dates found for person {person_id}, using default period: 2016-01-01 to 2016-01-01")
+        # Line the date ranges up with the person table; persons with no valid
+        # dates get the default 2016-01-01 to 2016-01-01 period
+        person_ranges = date_ranges.reindex(person_df['person_id'])
+        has_dates = person_ranges['start_date'].notna().to_numpy()
+        default_date = pd.Timestamp(datetime(2016, 1, 1))
+        start_dates = person_ranges['start_date'].fillna(default_date)
+        end_dates = person_ranges['end_date'].fillna(default_date)
         
-        if not observation_periods:
-            logging.error("No observation periods created")
-            return
+        valid_periods = int(has_dates.sum())
+        default_periods = len(person_df) - valid_periods
+        if default_periods:
+            # One summary line (with a sample of IDs) instead of a line per person
+            default_person_ids = person_df['person_id'][~has_dates].tolist()
+            logging.info(
+                "No valid dates found for %d persons, using default period 2016-01-01 to 2016-01-01: %s",
+                default_periods, default_person_ids[:20]
+            )
         
-        # Create dataframe
-        result_df = pd.DataFrame(observation_periods)
+        # Create dataframe with one sequential observation_period_id per person
+        result_df = pd.DataFrame({
+            'observation_period_id': np.arange(1, len(person_df) + 1, dtype=np.int64),
+            'person_id': person_df['person_id'].to_numpy(),
+            'observation_period_start_date': start_dates.to_numpy(),
+            'observation_period_end_date': end_dates.to_numpy(),
+            'period_type_concept_id': np.full(len(person_df), 32851, dtype=np.int32)  # Standard observation period
+        })
         
-        # Save to CSV
+        # Save to CSV, formatting the date columns on write
         output_path = "combined_omop/observation_period.csv"
-        result_df.to_csv(output_path, index=False)
+        result_df.to_csv(output_path, index=False, date_format=OMOP_DATE_FORMAT)
         
         logging.info(f"Created observation_period.csv with {len(result_df)} records")
         logging.info(f"Successfully created observation periods for {valid_periods} persons with valid dates")
@@ -159,9 +148,6 @@ def create_observation_periods():
         
         # Log some statistics
         if not result_df.empty:
-            start_dates = pd.to_datetime(result_df['observation_period_start_date'])
-            end_dates = pd.to_datetime(result_df['observation_period_end_date'])
-            
             logging.info(f"Overall date range: {start_dates.min().date()} to {end_dates.max().date()}")
             logging.info(f"Average observation period length: {(end_dates - start_dates).mean().days:.1f} days")
         
@@ -171,6 +157,7 @@ def create_observation_periods():
 
 def main():
     """Main function"""
+    logging.basicConfig(level=logging.INFO, force=True)
     logging.info("Starting observation period creation script...")
     create_observation_periods()
     logging.info("Observation period creation completed.")
@@ -1,6 +1,8 @@
 import pandas as pd
+import numpy as np
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 # List of tables to process
 tables = [
@@ -17,34 +19,50 @@ tables = [
 input_dir = "combined_omop"
 output_dir = "combined_omop"
 
-logging.basicConfig(
-            filename="logs/create_table_ids.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-)
 
-# Process each table
-for table in tables:
+def add_table_id(table):
+    """Add a sequential <table>_id column to one combined_omop table"""
     input_file = os.path.join(input_dir, f"{table}.csv")
     output_file = os.path.join(output_dir, f"{table}.csv")
 
     print(f"Processing {table}...")
 
-    # Read the CSV file
-    df = pd.read_csv(input_file)
-
     # Create the ID column name
     id_column_name = f"{table}_id"
 
-    # Check if ID column already exists
-    if id_column_name in df.columns:
+    # Check if ID column already exists from the header alone
+    if id_column_name in pd.read_csv(input_file, nrows=0).columns:
         print(f"Column {id_column_name} already exists in {table}.csv")
-    else:
+        if input_file == output_file:
+            # Rewriting the table in place would not change it
+            return
+
+    # Read the CSV file (memory-mapped, so the parser works on the file directly)
+    df = pd.read_csv(input_file, memory_map=True)
+
+    if id_column_name not in df.columns:
         # Create the ID column
-        df.insert(0, id_column_name, range(1, len(df) + 1))
+        df.insert(0, id_column_name, np.arange(1, len(df) + 1, dtype=np.int64))
         print(f"Added {id_column_name} to {table}.csv")
 
     # Save the modified DataFrame back to CSV
     df.to_csv(output_file, index=False)
 
-print("All tables processed successfully!")
+
+def main():
+    logging.basicConfig(
+        filename="logs/create_table_ids.log",
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        force=True,
+    )
+
+    # Each table is independent, so process them concurrently
+    with ThreadPoolExecutor(max_workers=len(tables)) as executor:
+        list(executor.map(add_table_id, tables))
+
+    print("All tables processed successfully!")
+
+
+if __name__ == "__main__":
+    main()
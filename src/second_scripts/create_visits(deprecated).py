@@ -1,6 +1,7 @@
 import pandas as pd
+import numpy as np
 import os
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
 
 # Configuration flag - set to 'create' or 'remove'
@@ -8,22 +9,8 @@ MODE = 'remove'  # Options: 'create' (normal visit creation) or 'remove' (remove
 
 logging.basicConfig(level=logging.INFO)
 
-
-def relative_day_to_date(relative_day, index_date):
-    """Convert relative day to actual date
-
-    Args:
-        relative_day (int): Number of days relative to index date
-        index_date (datetime): Reference date as datetime object
-
-    Returns:
-        datetime: Actual date, or None if conversion fails
-    """
-    try:
-        return index_date + timedelta(days=relative_day)
-    except Exception as e:
-        logging.error(f"Error converting relative day {relative_day} to date: {str(e)}")
-        return None
+# visit_occurrence_id format: CASE-NEUxxxxx_123 (case ID, then relative day)
+VISIT_ID_PATTERN = r"^([^_]*)_\s*([+-]?\d+)\s*$"
 
 
 def load_table_if_has_visits(filename):
@@ -34,41 +21,24 @@ def load_table_if_has_visits(filename):
             logging.warning(f"File {filename} is empty - skipping")
             return None
 
-        df = pd.read_csv(f"combined_omop/{filename}")
+        # Check the header first so tables without visits are never fully parsed
+        columns = pd.read_csv(f"combined_omop/{filename}", nrows=0).columns
+        if "visit_occurrence_id" not in columns:
+            logging.info(f"No visit_occurrence_id column in {filename}")
+            return None
+
+        df = pd.read_csv(f"combined_omop/{filename}", usecols=["visit_occurrence_id"])
         if df.empty:
             logging.warning(f"File {filename} has no data - skipping")
             return None
 
-        if "visit_occurrence_id" in df.columns:
-            logging.info(f"Found visit_occurrence_id in {filename}")
-            return df[["visit_occurrence_id"]].drop_duplicates()
-        else:
-            logging.info(f"No visit_occurrence_id column in {filename}")
-            return None
+        logging.info(f"Found visit_occurrence_id in {filename}")
+        return df.drop_duplicates()
     except Exception as e:
         logging.error(f"Error processing {filename}: {str(e)}")
         return None
 
 
-def extract_visit_components(visit_id):
-    """Extract case ID and relative day from visit_occurrence_id
-    Format: CASE-NEUxxxxx_123 where xxxxx is the case ID and 123 is the relative day
-    """
-    try:
-        # If visit_id is already an integer, it's already been processed
-        if isinstance(visit_id, int):
-            logging.warning(f"Visit ID {visit_id} is already an integer - skipping")
-            return None, None
-            
-        # Convert to string and split
-        visit_id_str = str(visit_id)
-        case_id, relative_day = visit_id_str.split("_")
-        return case_id, int(relative_day)
-    except Exception as e:
-        logging.error(f"Error extracting components from visit_id {visit_id}: {str(e)}")
-        return None, None
-
-
 def remove_visit_columns():
     """Remove visit_occurrence_id columns from all tables"""
     csv_files = [f for f in os.listdir("combined_omop") if f.endswith(".csv")]
@@ -77,8 +47,9 @@ def remove_visit_columns():
     removed_count = 0
     for file in csv_files:
         try:
-            df = pd.read_csv(f"combined_omop/{file}")
-            if "visit_occurrence_id" in df.columns:
+            columns = pd.read_csv(f"combined_omop/{file}", nrows=0).columns
+            if "visit_occurrence_id" in columns:
+                df = pd.read_csv(f"combined_omop/{file}")
                 df = df.drop(columns=["visit_occurrence_id"])
                 df.to_csv(f"combined_omop/{file}", index=False)
                 logging.info(f"Removed visit_occurrence_id column from {file}")
@@ -107,55 +78,57 @@ def create_visits():
         logging.error("No tables with visit_occurrence_id found")
         return
 
-    # Combine all visit IDs and get unique values
-    visits_df = pd.concat(all_visits, ignore_index=True).drop_duplicates()
+    # Combine all visit IDs and get unique values; as a categorical the
+    # repeated IDs are deduplicated on integer codes
+    visits_df = (
+        pd.concat(all_visits, ignore_index=True)
+        .astype({"visit_occurrence_id": "category"})
+        .drop_duplicates()
+    )
     logging.info(f"Found {len(visits_df)} unique visit IDs")
 
-    # Create components for visit_occurrence table
-    visit_data = []
-
     # Use 2016-01-01 as reference date
     reference_date = datetime(2016, 1, 1)
 
-    for _, row in visits_df.iterrows():
-        case_id, relative_day = extract_visit_components(row["visit_occurrence_id"])
-        if case_id is not None and relative_day is not None:
-            visit_date = relative_day_to_date(relative_day, reference_date)
-            if visit_date:
-                visit_data.append(
-                    {
-                        "visit_occurrence_id": row[
-                            "visit_occurrence_id"
-                        ],  # Original ID
-                        "person_id": case_id,  # Using the full CASE-NEU ID as person_id
-                        "visit_start_date": visit_date.strftime("%Y-%m-%d"),
-                        "visit_end_date": visit_date.strftime(
-                            "%Y-%m-%d"
-                        ),  # Same as start date for now
-                        "visit_type_c": 32851,  # Outpatient visit
-                        "care_site_id": 111219,  # Default care site
-                    }
-                )
-
-    if not visit_data:
-        logging.error("No valid visits were created")
-        return
+    # Split every visit ID into case ID and relative day in one pass; IDs that
+    # are already integers or not in the expected format do not match
+    components = (
+        visits_df["visit_occurrence_id"].astype(str).str.extract(VISIT_ID_PATTERN)
+    )
+    valid = components[0].notna()
+    if not valid.all():
+        logging.error(f"Could not extract components from {(~valid).sum()} visit IDs")
+
+    components = components[valid]
+    visit_dates = reference_date + pd.to_timedelta(components[1].astype("int64"), unit="D")
 
     # Create final dataframe
-    result_df = pd.DataFrame(visit_data)
+    result_df = pd.DataFrame(
+        {
+            "visit_occurrence_id": visits_df["visit_occurrence_id"][valid],  # Original ID
+            "person_id": components[0],  # Using the full CASE-NEU ID as person_id
+            "visit_start_date": visit_dates,
+            "visit_end_date": visit_dates,  # Same as start date for now
+            "visit_type_c": 32851,  # Outpatient visit
+            "care_site_id": 111219,  # Default care site
+        }
+    ).reset_index(drop=True)
+
+    if result_df.empty:
+        logging.error("No valid visits were created")
+        return
 
     # Add sequential ID and source column
     result_df["visit_source_value"] = result_df["visit_occurrence_id"]
-    result_df["visit_occurrence_id"] = range(1, len(result_df) + 1)
+    result_df["visit_occurrence_id"] = np.arange(1, len(result_df) + 1, dtype=np.int64)
 
-    # Save to CSV
-    result_df.to_csv("combined_omop/visit_occurrence.csv", index=False)
+    # Save to CSV, formatting the visit dates on write
+    result_df.to_csv("combined_omop/visit_occurrence.csv", index=False, date_format="%Y-%m-%d")
     logging.info(f"Created visit_occurrence.csv with {len(result_df)} visits")
 
-    # Create mapping dictionary for updating other tables
-    visit_mapping = dict(
-        zip(result_df["visit_source_value"], result_df["visit_occurrence_id"])
-    )
+    # Index the new IDs by original visit ID for updating other tables; mapping
+    # through a Series uses pandas' indexer instead of per-value dict lookups
+    visit_mapping = result_df.set_index("visit_source_value")["visit_occurrence_id"]
 
     # Update visit IDs in other tables
     for file in csv_files:
@@ -194,7 +167,7 @@ def create_observation_periods():
 
         # Add observation_period_id and period_type_concept_id
         observation_periods.insert(
-            0, "observation_period_id", range(1, len(observation_periods) + 1)
+            0, "observation_period_id", np.arange(1, len(observation_periods) + 1, dtype=np.int64)
         )
         observation_periods["period_type_concept_id"] = 32851
 
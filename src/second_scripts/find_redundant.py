@@ -1,11 +1,10 @@
 import pandas as pd
 import os
-from collections import defaultdict
 
 
 def load_concept_mappings():
     """Load concept mappings from all CSV files in the usagi directory."""
-    concept_mappings = {}
+    mapping_frames = []
     usagi_dir = "source_tables/usagi"
 
     # Get all CSV files in the usagi directory
@@ -14,17 +13,21 @@ def load_concept_mappings():
     for file in mapping_files:
         file_path = os.path.join(usagi_dir, file)
         try:
-            df = pd.read_csv(file_path)
+            df = pd.read_csv(
+                file_path, usecols=lambda col: col in ("conceptId", "conceptName")
+            )
             if "conceptId" in df.columns and "conceptName" in df.columns:
-                for _, row in df.iterrows():
-                    concept_id = row["conceptId"]
-                    concept_name = row["conceptName"]
-                    if pd.notna(concept_id) and pd.notna(concept_name):
-                        concept_mappings[int(concept_id)] = concept_name
+                df = df.dropna(subset=["conceptId", "conceptName"])
+                mapping_frames.append(df.astype({"conceptId": "int64"}))
         except Exception as e:
             print(f"Error processing mapping file {file}: {str(e)}")
 
-    return concept_mappings
+    if not mapping_frames:
+        return {}
+
+    # Later files and rows override earlier ones for the same conceptId
+    mappings = pd.concat(mapping_frames, ignore_index=True)
+    return dict(zip(mappings["conceptId"], mappings["conceptName"]))
 
 
 def find_redundant_concept_ids():
@@ -34,8 +37,8 @@ def find_redundant_concept_ids():
     # Directory containing OMOP tables
     omop_dir = "processed_source"
 
-    # Dictionary to store concept IDs by person_id and table
-    person_concept_ids = defaultdict(lambda: defaultdict(set))
+    # Long-format (person_id, concept_column, concept_id, table) frames per file
+    concept_frames = []
 
     # Get all CSV files
     csv_files = [f for f in os.listdir(omop_dir) if f.endswith(".csv")]
@@ -46,62 +49,62 @@ def find_redundant_concept_ids():
         file_path = os.path.join(omop_dir, file)
 
         try:
-            # Read the CSV file
-            df = pd.read_csv(file_path)
+            # Read the header first; only person_id and concept_id columns are loaded
+            header = pd.read_csv(file_path, nrows=0).columns
 
             # Check if file has person_id and any concept_id columns
-            if "person_id" in df.columns:
+            if "person_id" in header:
                 # Get concept_id columns, excluding _type_concept_id
                 concept_id_cols = [
                     col
-                    for col in df.columns
+                    for col in header
                     if "_concept_id" in col and "_type_concept_id" not in col
                 ]
 
                 if concept_id_cols:
-                    # For each person and concept_id column, store the values
-                    for _, row in df.iterrows():
-                        person_id = row["person_id"]
-                        for col in concept_id_cols:
-                            if pd.notna(row[col]):
-                                person_concept_ids[person_id][table_name].add(
-                                    (col, row[col])
-                                )
+                    df = pd.read_csv(file_path, usecols=["person_id"] + concept_id_cols)
+
+                    # Melt the concept_id columns to one (person, column, value) row each
+                    long_df = (
+                        df[["person_id"] + concept_id_cols]
+                        .melt(id_vars="person_id", var_name="concept_column", value_name="concept_id")
+                        .dropna(subset=["concept_id"])
+                    )
+
+                    long_df["table"] = table_name
+                    concept_frames.append(long_df)
 
         except Exception as e:
             print(f"Error processing {file}: {str(e)}")
 
-    # Find redundancies
-    redundancies = []
-    for person_id, table_concepts in person_concept_ids.items():
-        # Create a dictionary to track concept_id values across tables
-        concept_values = defaultdict(list)
-
-        for table, concepts in table_concepts.items():
-            for col, value in concepts:
-                concept_values[(col, value)].append(table)
-
-        # Check for values that appear in multiple tables
-        for (col, value), tables in concept_values.items():
-            if len(tables) > 1:
-                concept_name = concept_mappings.get(int(value), "Unknown")
-                redundancies.append(
-                    {
-                        "person_id": person_id,
-                        "concept_column": col,
-                        "concept_id": value,
-                        "concept_name": concept_name,
-                        "tables": ";".join(
-                            tables
-                        ),  # Join tables with semicolon for CSV
-                    }
-                )
+    # Find redundancies: concept values a person has in more than one table
+    redundancies = pd.DataFrame()
+    if concept_frames:
+        keys = ["person_id", "concept_column", "concept_id"]
+        all_concepts = pd.concat(concept_frames, ignore_index=True)
+
+        # person_id, column and table names repeat heavily; as categoricals the
+        # deduplication and grouping below work on integer codes
+        all_concepts = all_concepts.astype(
+            {"person_id": "category", "concept_column": "category", "table": "category"}
+        ).drop_duplicates()
+        tables = all_concepts.groupby(keys, sort=False, observed=True)["table"]
+        redundancies = (
+            tables.agg(";".join)  # Join tables with semicolon for CSV
+            [tables.size() > 1]
+            .reset_index(name="tables")
+        )
+        concept_names = pd.Series(concept_mappings, dtype=object)
+        redundancies.insert(
+            3,
+            "concept_name",
+            redundancies["concept_id"].astype("int64").map(concept_names).fillna("Unknown"),
+        )
 
     # Convert to DataFrame and save to CSV
-    if redundancies:
-        df_redundancies = pd.DataFrame(redundancies)
+    if not redundancies.empty:
         output_file = "redundant_concept_ids.csv"
-        df_redundancies.to_csv(output_file, index=False)
+        redundancies.to_csv(output_file, index=False)
         print(
             f"\nFound {len(redundancies)} redundant concept IDs. Results saved to {output_file}"
         )
@@ -109,5 +112,9 @@ def find_redundant_concept_ids():
         print("\nNo redundant concept IDs found across different tables.")
 
 
-if __name__ == "__main__":
+def main():
     find_redundant_concept_ids()
+
+
+if __name__ == "__main__":
+    main()
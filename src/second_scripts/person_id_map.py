@@ -1,29 +1,10 @@
 import pandas as pd
+import numpy as np
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-# Read the original person.csv file
-person_df = pd.read_csv("combined_omop/person.csv")
-
-# Create a mapping DataFrame with original IDs and new sequential IDs
-mapping_df = pd.DataFrame(
-    {
-        "Participant_ID": person_df["person_id"],
-        "person_id": range(1, len(person_df) + 1),
-    }
-)
-
-# Save the mapping to a new CSV file
-mapping_df.to_csv("combined_omop/person_id_mapping.csv", index=False)
-
-# Update the person.csv file with new IDs
-person_df["person_id"] = mapping_df["person_id"]
-person_df.to_csv("combined_omop/person.csv", index=False)
-
-print(f"Created mapping file with {len(mapping_df)} entries")
-print("Updated person.csv with new sequential IDs")
-
-# Create a dictionary for faster lookups
-id_mapping = dict(zip(mapping_df["Participant_ID"], mapping_df["person_id"]))
+# Rows per chunk when streaming a table through the person_id remap
+CHUNK_SIZE = 200_000
 
 # List of tables that might contain person_id
 tables_to_update = [
@@ -38,18 +19,85 @@ tables_to_update = [
     "observation_period.csv",
 ]
 
-# Process each table
-for table in tables_to_update:
+
+def update_table_person_ids(table, id_mapping):
+    """Remap person_id in one combined_omop table and return a status message"""
     file_path = os.path.join("combined_omop", table)
-    if os.path.exists(file_path):
+
+    # Check the header first so tables without person_id are never fully parsed
+    header = pd.read_csv(file_path, nrows=0).columns
+
+    if "person_id" not in header:
+        return f"Skipping {table} - no person_id column found"
+
+    # Unmapped person_ids leave NaN in the column, which makes the whole column
+    # float; check up front so every chunk is written with the same dtype
+    all_mapped = (
+        pd.read_csv(file_path, usecols=["person_id"])["person_id"].map(id_mapping).notna().all()
+    )
+
+    # Stream the table in chunks so memory stays bounded. Every column except
+    # person_id is copied through as text, so chunk boundaries cannot change
+    # how a column is inferred or formatted
+    passthrough_dtypes = {col: str for col in header if col != "person_id"}
+    temp_path = f"{file_path}.tmp"
+    first = True
+    for chunk in pd.read_csv(file_path, dtype=passthrough_dtypes, chunksize=CHUNK_SIZE):
+        # Update person_ids using the mapping
+        person_ids = chunk["person_id"].map(id_mapping)
+        chunk["person_id"] = person_ids if all_mapped else person_ids.astype("float64")
+        chunk.to_csv(temp_path, mode="w" if first else "a", header=first, index=False)
+        first = False
+
+    # Replace the original file with the updated one
+    os.replace(temp_path, file_path)
+    return f"Updated {table} with new person_ids"
+
+
+def main():
+    # Read the original person.csv file
+    person_df = pd.read_csv("combined_omop/person.csv")
+
+    # Create a mapping DataFrame with original IDs and new sequential IDs
+    mapping_df = pd.DataFrame(
+        {
+            "Participant_ID": person_df["person_id"],
+            "person_id": np.arange(1, len(person_df) + 1, dtype=np.int64),
+        }
+    )
+
+    # Save the mapping to a new CSV file
+    mapping_df.to_csv("combined_omop/person_id_mapping.csv", index=False)
+
+    # Update the person.csv file with new IDs
+    person_df["person_id"] = mapping_df["person_id"]
+    person_df.to_csv("combined_omop/person.csv", index=False)
+
+    print(f"Created mapping file with {len(mapping_df)} entries")
+    print("Updated person.csv with new sequential IDs")
+
+    # Index the mapping by original ID for the lookups (last entry wins for
+    # duplicated IDs, as with a dict)
+    id_mapping = (
+        mapping_df.drop_duplicates("Participant_ID", keep="last")
+        .set_index("Participant_ID")["person_id"]
+    )
+
+    # Each table is remapped independently, so process them concurrently
+    tables = [
+        table
+        for table in tables_to_update
+        if os.path.exists(os.path.join("combined_omop", table))
+    ]
+    with ThreadPoolExecutor(max_workers=max(len(tables), 1)) as executor:
+        messages = list(
+            executor.map(lambda table: update_table_person_ids(table, id_mapping), tables)
+        )
+
+    for table, message in zip(tables, messages):
         print(f"\nProcessing {table}...")
-        df = pd.read_csv(file_path)
-
-        if "person_id" in df.columns:
-            # Update person_ids using the mapping
-            df["person_id"] = df["person_id"].map(id_mapping)
-            # Save the updated file
-            df.to_csv(file_path, index=False)
-            print(f"Updated {table} with new person_ids")
-        else:
-            print(f"Skipping {table} - no person_id column found")
+        print(message)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,22 @@
 import pandas as pd
 import os
+from concurrent.futures import ThreadPoolExecutor
 
+# Rows per chunk when streaming a table through the ID transformation
+CHUNK_SIZE = 200_000
 
-def transform_id(original_id):
+
+def transform_id_series(ids):
     """
-    Transform an ID to a 9-digit format with:
+    Transform a column of IDs to a 9-digit format with:
     - First 2 digits: 11
     - Middle digits: zeros
-    - Last digits: original ID
+    - Last digits: original ID (its digits only, truncated to the last 7)
     """
-    # Convert original_id to string and remove any non-numeric characters
-    original_id = str(original_id)
-    original_id = "".join(filter(str.isdigit, original_id))
-
-    # Calculate how many zeros we need
-    zeros_needed = 7 - len(original_id)  # 9 (total) - 2 (prefix) = 7
-    if zeros_needed < 0:
-        # If original ID is too long, truncate it
-        original_id = original_id[-7:]
-        zeros_needed = 0
-
-    # Create the new ID
-    new_id = f"11{'0' * zeros_needed}{original_id}"
-    return new_id
+    # IDs are read as text, so work on the string form of each value
+    digits = pd.Series(ids.to_numpy(dtype=object).astype(str), index=ids.index, dtype=object)
+    digits = digits.str.replace(r"\D", "", regex=True).str[-7:].str.zfill(7)
+    return "11" + digits
 
 
 def transform_table_ids(table_name, input_dir="combined_omop", output_dir="final_omop"):
@@ -47,27 +41,29 @@ def transform_table_ids(table_name, input_dir="combined_omop", output_dir="final
         print(f"Warning: {input_file} is empty or does not exist. Skipping.")
         return
 
-    # Read the CSV file
+    # Stream the CSV file in chunks so memory stays bounded. Everything is read
+    # as text, so chunk boundaries cannot change how a column is inferred or
+    # formatted (the IDs are transformed from their string form anyway)
     print(f"  Reading {input_file}...")
-    df = pd.read_csv(input_file)
-    print(f"  Read {len(df)} rows and {len(df.columns)} columns.")
-
-    # Get the ID column name
     id_column_name = f"{table_name}_id"
+    row_count = 0
+    first = True
+    for chunk in pd.read_csv(input_file, dtype=str, chunksize=CHUNK_SIZE):
+        # Transform the table's own ID, then person_id and visit_occurrence_id if they exist
+        id_columns = [
+            col for col in [id_column_name, "person_id", "visit_occurrence_id"] if col in chunk.columns
+        ]
+        for col in id_columns:
+            chunk[col] = transform_id_series(chunk[col])
+
+        chunk.to_csv(output_file, mode="w" if first else "a", header=first, index=False)
+        row_count += len(chunk)
+        first = False
+
+    print(f"  Read {row_count} rows and {len(chunk.columns)} columns.")
+    for col in id_columns:
+        print(f"Transformed {col} in {table_name}.csv")
 
-    # Transform the IDs
-    if id_column_name in df.columns:
-        df[id_column_name] = df[id_column_name].apply(transform_id)
-        print(f"Transformed {id_column_name} in {table_name}.csv")
-
-    # Also transform person_id and visit_occurrence_id if they exist
-    for col in ["person_id", "visit_occurrence_id"]:
-        if col in df.columns:
-            df[col] = df[col].apply(transform_id)
-            print(f"Transformed {col} in {table_name}.csv")
-
-    # Save the modified DataFrame back to CSV
-    df.to_csv(output_file, index=False)
     print(f"Saved transformed {table_name}.csv")
 
 
@@ -86,9 +82,9 @@ def main():
         "visit_occurrence",
     ]
 
-    # Process each table
-    for table in tables:
-        transform_table_ids(table)
+    # Each table is independent, so process them concurrently
+    with ThreadPoolExecutor(max_workers=len(tables)) as executor:
+        list(executor.map(transform_table_ids, tables))
 
     print("All tables processed successfully!")
 
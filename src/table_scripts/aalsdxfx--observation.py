@@ -1,11 +1,10 @@
 import pandas as pd
+import numpy as np
+import functools
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from helpers import (
-    relative_day_to_date,
-    check_missing_concept_ids,
-    get_visit_occurrence_id,
-)
+from helpers import check_missing_concept_ids
 
 # Set up logging
 logging.basicConfig(
@@ -15,213 +14,79 @@ logging.basicConfig(
 )
 
 
-def aalsdx1_to_observation_value_as_concept_id(value):
-    """Convert alsdx1 value to concept ID"""
-    mapping = {
-        1: 45877994,  # Yes
-        2: 45878245,  # No
-        90: 45881531,  # Not assessed
-    }
-    return mapping.get(value, 0)
-
-
-def aalsdx1_to_observation_value_source_value(value):
-    """Convert alsdx1 value to source value"""
-    mapping = {
-        1: "Yes",
-        2: "No",
-        90: "Not Done",
-    }
-    return mapping.get(value, "Unknown")
-
-
-def aalsdx2_to_observation_value_as_concept_id(value):
-    """Convert alsdx2 value to concept ID"""
-    mapping = {
-        1: 45877994,  # Yes
-        2: 45878245,  # No
-        90: 45881531,  # Not assessed
-    }
-    return mapping.get(value, 0)
-
-
-def aalsdx2_to_observation_value_source_value(value):
-    """Convert alsdx2 value to source value"""
-    mapping = {
-        1: "Yes",
-        2: "No",
-        90: "Not Done",
-    }
-    return mapping.get(value, "Unknown")
-
-
-def aalsdx3_to_observation_value_as_concept_id(value):
-    """Convert alsdx3 value to concept ID"""
-    mapping = {
-        1: 45877994,  # Yes
-        2: 45878245,  # No
-        90: 45881531,  # Not assessed
-    }
-    return mapping.get(value, 0)
-
-
-def aalsdx3_to_observation_value_source_value(value):
-    """Convert alsdx3 value to source value"""
-    mapping = {
-        1: "Yes",
-        2: "No",
-        90: "Not Done",
-    }
-    return mapping.get(value, "Unknown")
-
-
-# Load concept.csv for concept lookups
+# Value mappings shared by the observation items. The alsdx, clinical and EMG
+# indicators all use 1 = Yes, 2 = No, 90 = Not Done
+YES_NO_CONCEPT_IDS = {
+    1: 45877994,  # Yes
+    2: 45878245,  # No
+    90: 45881531,  # Not assessed
+}
+
+YES_NO_SOURCE_VALUES = {
+    1: "Yes",
+    2: "No",
+    90: "Not Done",
+}
+
+EMG_SOURCE_VALUES = {
+    1: "Denervation",
+    2: "No Denervation",
+    90: "Not Done",
+}
+
+ELESCRLR_CONCEPT_IDS = {
+    1: 2000000062,  # Suspected
+    2: 2000000058,  # Possible
+    3: 2000000060,  # Probable Laboratory Supported
+    4: 2000000059,  # Probable
+    5: 2000000057,  # Definite
+}
+
+ELESCRLR_SOURCE_VALUES = {
+    1: "Suspected",
+    2: "Possible",
+    3: "Probable Laboratory Supported",
+    4: "Probable",
+    5: "Definite",
+}
+
+
+# Load concept.csv for concept lookups (once per process, and only the two
+# columns that are used)
+@functools.lru_cache(maxsize=1)
 def load_concept_lookup():
-    concept_df = pd.read_csv("source_tables/omop_tables/concept.csv", dtype=str)
-    concept_id_to_name = dict(zip(concept_df["concept_id"].astype(int), concept_df["concept_name"]))
+    concept_df = pd.read_csv(
+        "source_tables/omop_tables/concept.csv",
+        usecols=["concept_id", "concept_name"],
+        dtype={"concept_id": "int64", "concept_name": str},
+    )
+    # concept_name Series indexed by concept_id (the last row wins for a repeated concept_id)
+    concept_id_to_name = concept_df.drop_duplicates("concept_id", keep="last").set_index(
+        "concept_id"
+    )["concept_name"]
     return concept_id_to_name
 
 CONCEPT_ID_TO_NAME = load_concept_lookup()
 
 
-def elescrlr_to_observation_value_as_concept_id(value):
-    """Convert elescrlr value to concept ID, using concept.csv if possible"""
-    mapping = {
-        1: 2000000062,  # Suspected
-        2: 2000000058,  # Possible
-        3: 2000000060,  # Probable Laboratory Supported
-        4: 2000000059,  # Probable
-        5: 2000000057,  # Definite
-    }
-    concept_id = mapping.get(value, 0)
-    # Only return if present in concept.csv, else fallback to hardcoded
-    if concept_id in CONCEPT_ID_TO_NAME:
-        return concept_id
-    return concept_id  # fallback (could be 0)
-
-
-def elescrlr_to_observation_value_source_value(value):
-    """Convert elescrlr value to source value"""
-    mapping = {
-        1: "Suspected",
-        2: "Possible",
-        3: "Probable Laboratory Supported",
-        4: "Probable",
-        5: "Definite",
-    }
-    return mapping.get(value, "Unknown")
-
-
-def clinical_indicator_to_observation_value_as_concept_id(value):
-    """Convert clinical indicator value to concept ID"""
-    mapping = {
-        1: 45877994,  # Yes
-        2: 45878245,  # No
-        90: 45881531,  # Not assessed
-    }
-    return mapping.get(value, 0)
-
-
-def clinical_indicator_to_observation_value_source_value(value):
-    """Convert clinical indicator value to source value"""
-    mapping = {
-        1: "Yes",
-        2: "No",
-        90: "Not Done",
-    }
-    return mapping.get(value, "Unknown")
-
-
-def emg_indicator_to_observation_value_as_concept_id(value):
-    """Convert EMG indicator value to concept ID"""
-    mapping = {
-        1: 45877994,  # Yes (Denervation)
-        2: 45878245,  # No (No Denervation)
-        90: 45881531,  # Not assessed (Not Done)
-    }
-    return mapping.get(value, 0)
-
-
-def emg_indicator_to_observation_value_source_value(value):
-    """Convert EMG indicator value to source value"""
-    mapping = {
-        1: "Denervation",
-        2: "No Denervation",
-        90: "Not Done",
-    }
-    return mapping.get(value, "Unknown")
-
-
-def aalsdx1_to_observation_value_as_concept_name(value):
-    """Convert alsdx1 value to concept name"""
-    mapping = {
-        1: "yes",  # 45877994
-        2: "no",  # 45878245
-        90: "not assessed",  # 45881531
-    }
-    return mapping.get(value, "Unknown")
-
-
-def aalsdx2_to_observation_value_as_concept_name(value):
-    """Convert alsdx2 value to concept name"""
-    mapping = {
-        1: "yes",  # 45877994
-        2: "no",  # 45878245
-        90: "not assessed",  # 45881531
-    }
-    return mapping.get(value, "Unknown")
-
-
-def aalsdx3_to_observation_value_as_concept_name(value):
-    """Convert alsdx3 value to concept name"""
-    mapping = {
-        1: "yes",  # 45877994
-        2: "no",  # 45878245
-        90: "not assessed",  # 45881531
-    }
-    return mapping.get(value, "Unknown")
-
-
-def elescrlr_to_observation_value_as_concept_name(value):
-    """Convert elescrlr value to concept name using concept.csv only"""
-    value_to_concept_id = {
-        1: 2000000062,  # Suspected
-        2: 2000000058,  # Possible
-        3: 2000000060,  # Probable Laboratory Supported
-        4: 2000000059,  # Probable
-        5: 2000000057,  # Definite
-    }
-    concept_id = value_to_concept_id.get(value)
-    if concept_id is not None:
-        return CONCEPT_ID_TO_NAME[concept_id]
-    return "Unknown"
-
-
-def clinical_indicator_to_observation_value_as_concept_name(value):
-    """Convert clinical indicator value to concept name"""
-    mapping = {
-        1: "yes",  # 45877994
-        2: "no",  # 45878245
-        90: "not assessed",  # 45881531
-    }
-    return mapping.get(value, "Unknown")
-
-
-def emg_indicator_to_observation_value_as_concept_name(value):
-    """Convert EMG indicator value to concept name"""
-    mapping = {
-        1: "yes",  # 45877994
-        2: "no",  # 45878245
-        90: "not assessed",  # 45881531
-    }
-    return mapping.get(value, "Unknown")
+def map_coded_values(values, mapping, default):
+    """
+    Map categorical coded values through a dict. Only the categories are looked up,
+    and the result is spread back to the rows through the category codes.
+    Values without a mapping get the default.
+    """
+    dtype = np.int64 if isinstance(default, int) else object
+    mapped_categories = np.array(
+        [mapping.get(code, default) for code in values.cat.categories], dtype=dtype
+    )
+    return pd.Series(mapped_categories[values.cat.codes.to_numpy()], index=values.index)
 
 
-def format_source_value(table, var, var_interpretation, value, value_interpretation):
+def format_source_values(table, var, var_interpretation, values, value_interpretations):
     """
-    Format source value as: table+var (var_interpretation): value (val_interpretation)
+    Format source values as: table+var (var_interpretation): value (val_interpretation)
     Omit interpretation if same as term before or missing. Use actual variable name if no variable.
-    No pipes for singles.
+    No pipes for singles. Vectorized over a Series of values and their interpretations.
     """
     # Table and variable
     if var:
@@ -232,15 +97,57 @@ def format_source_value(table, var, var_interpretation, value, value_interpretat
     if var_interpretation and var_interpretation.strip() and var_interpretation.strip().lower() != var.strip().lower():
         left += f" ({var_interpretation})"
     # Value
-    if value is not None:
-        right = f"{value}"
-        # Value interpretation
-        if value_interpretation and str(value_interpretation).strip() and str(value_interpretation).strip().lower() != str(value).strip().lower():
-            right += f" ({value_interpretation})"
-        return f"{left}: {right}"
-    else:
-        # No value provided - just return the variable with interpretation
-        return left
+    right = values.astype(str)
+    # Value interpretation
+    interpretations = value_interpretations.astype(str)
+    stripped = interpretations.str.strip()
+    has_interpretation = (
+        value_interpretations.astype(bool)
+        & stripped.ne("")
+        & stripped.str.lower().ne(right.str.strip().str.lower())
+    )
+    right = right.where(~has_interpretation, right + " (" + interpretations + ")")
+    return left + ": " + right
+
+
+def item_mapping_key(item):
+    """Key of the columns an item maps from: its source column and value mappings"""
+    return (
+        item["source_column"],
+        id(item["value_as_concept_ids"]),
+        id(item["value_source_values"]),
+    )
+
+
+def map_item_column(df, item, has_value, observation_dates, visit_occurrence_ids):
+    """
+    Build the observation columns that only depend on an item's source column and
+    value mappings, from the rows where the source column has a value (has_value)
+    """
+    var_name = item["source_column"]
+    column = df[var_name]
+    # Few distinct codes per column, so the mappings below only run over the categories
+    values = column[has_value].astype("int64").astype("category")
+
+    # value_source_value: table+var: value (interpretation), omit parentheses if interpretation is missing or same as value
+    categories = pd.Series(values.cat.categories)
+    category_source_values = format_source_values(
+        "aalsdxfx",
+        var_name,
+        None,
+        categories,
+        categories.map(item["value_source_values"]).fillna("Unknown"),
+    )
+    val_source_values = map_coded_values(
+        values, dict(zip(categories, category_source_values)), ""
+    )
+    return {
+        "person_id": df["Participant_ID"][has_value],
+        "observation_date": observation_dates[has_value],
+        "value_as_concept_id": map_coded_values(values, item["value_as_concept_ids"], 0),
+        "value_source_value": val_source_values,
+        "visit_occurrence_id": visit_occurrence_ids[has_value],
+    }
 
 
 def process_aalsdxfx_to_observation(source_file, index_date):
@@ -252,13 +159,6 @@ def process_aalsdxfx_to_observation(source_file, index_date):
         index_date (datetime): Reference date for relative day calculations
     """
     try:
-        # Read source data
-        df = pd.read_csv(source_file)
-        logging.info(f"Successfully read {len(df)} rows from {source_file}")
-
-        # Initialize empty list to store observations
-        observations = []
-
         # Define observation items and their mappings
         observation_items = [
             {
@@ -266,284 +166,329 @@ def process_aalsdxfx_to_observation(source_file, index_date):
                 "concept_id": 2000002000,
                 "concept_name": CONCEPT_ID_TO_NAME[2000002000],
                 "source_value": "Topographical location and pattern of progression of UMN and LMN signs, including signs of spread within a region or to other regions, consistent with ALS?",
-                "value_converter": aalsdx1_to_observation_value_as_concept_id,
-                "source_value_converter": aalsdx1_to_observation_value_source_value,
-                "concept_name_converter": aalsdx1_to_observation_value_as_concept_name,
+                "value_as_concept_ids": YES_NO_CONCEPT_IDS,
+                "value_source_values": YES_NO_SOURCE_VALUES,
             },
             {
                 "source_column": "alsdx1",
                 "concept_id": 2000002001,
                 "concept_name": CONCEPT_ID_TO_NAME[2000002001],
                 "source_value": "Topographical location and pattern of progression of UMN and LMN signs, including signs of spread within a region or to other regions, consistent with ALS?",
-                "value_converter": aalsdx1_to_observation_value_as_concept_id,
-                "source_value_converter": aalsdx1_to_observation_value_source_value,
-                "concept_name_converter": aalsdx1_to_observation_value_as_concept_name,
+                "value_as_concept_ids": YES_NO_CONCEPT_IDS,
+                "value_source_values": YES_NO_SOURCE_VALUES,
             },
             {
                 "source_column": "alsdx1",
                 "concept_id": 2000000020,
                 "concept_name": CONCEPT_ID_TO_NAME[2000000020],
                 "source_value": "Topographical location and pattern of progression of UMN and LMN signs, including signs of spread within a region or to other regions, consistent with ALS?",
-                "value_converter": aalsdx1_to_observation_value_as_concept_id,
-                "source_value_converter": aalsdx1_to_observation_value_source_value,
-                "concept_name_converter": aalsdx1_to_observation_value_as_concept_name,
+                "value_as_concept_ids": YES_NO_CONCEPT_IDS,
+                "value_source_values": YES_NO_SOURCE_VALUES,
             },
             {
                 "source_column": "alsdx2",
                 "concept_id": 2000000021,
                 "concept_name": CONCEPT_ID_TO_NAME[2000000021],
                 "source_value": "Exclusion by electrophysiological testing of all other processes including conduction block that might explain the underlying signs and symptoms?",
-                "value_converter": aalsdx2_to_observation_value_as_concept_id,
-                "source_value_converter": aalsdx2_to_observation_value_source_value,
-                "concept_name_converter": aalsdx2_to_observation_value_as_concept_name,
+                "value_as_concept_ids": YES_NO_CONCEPT_IDS,
+                "value_source_values": YES_NO_SOURCE_VALUES,
             },
             {
                 "source_column": "alsdx3",
                 "concept_id": 2000000022,
                 "concept_name": CONCEPT_ID_TO_NAME[2000000022],
                 "source_value": "Exclusion by neuroimaging of other disease processes such as myelopathy or radiculopathy that might explain observed clinical and electrophysiological signs?",
-                "value_converter": aalsdx3_to_observation_value_as_concept_id,
-                "source_value_converter": aalsdx3_to_observation_value_source_value,
-                "concept_name_converter": aalsdx3_to_observation_value_as_concept_name,
+                "value_as_concept_ids": YES_NO_CONCEPT_IDS,
+                "value_source_values": YES_NO_SOURCE_VALUES,
             },
             {
                 "source_column": "elescrlr",
                 "concept_id": 2000000061,
                 "concept_name": CONCEPT_ID_TO_NAME[2000000061],
                 "source_value": "Revised El Escorial Criteria for ALS",
-                "value_converter": elescrlr_to_observation_value_as_concept_id,
-                "source_value_converter": elescrlr_to_observation_value_source_value,
-                "concept_name_converter": elescrlr_to_observation_value_as_concept_name,
+                "value_as_concept_ids": ELESCRLR_CONCEPT_IDS,
+                "value_source_values": ELESCRLR_SOURCE_VALUES,
             },
             {
                 "source_column": "blbcumn",
                 "concept_id": 2000000035,
                 "concept_name": CONCEPT_ID_TO_NAME[2000000035],
                 "source_value": "Bulbar upper motor neuron clinical indicator",
-                "value_converter": clinical_indicator_to_observation_value_as_concept_id,
-                "source_value_converter": clinical_indicator_to_observation_value_source_value,
-                "concept_name_converter": clinical_indicator_to_observation_value_as_concept_name,
+                "value_as_concept_ids": YES_NO_CONCEPT_IDS,
+                "value_source_values": YES_NO_SOURCE_VALUES,
             },
             {
                 "source_column": "luecumn",
                 "concept_id": 2000002002,
                 "concept_name": CONCEPT_ID_TO_NAME[2000002002],
                 "source_value": "Left upper extremity upper motor neuron clinical indicator",
-                "value_converter": clinical_indicator_to_observation_value_as_concept_id,
-                "source_value_converter": clinical_indicator_to_observation_value_source_value,
-                "concept_name_converter": clinical_indicator_to_observation_value_as_concept_name,
+                "value_as_concept_ids": YES_NO_CONCEPT_IDS,
+                "value_source_values": YES_NO_SOURCE_VALUES,
             },
             {
                 "source_column": "ruecumn",
                 "concept_id": 2000002003,
                 "concept_name": CONCEPT_ID_TO_NAME[2000002003],
                 "source_value": "Right upper extremity upper motor neuron clinical indicator",
-                "value_converter": clinical_indicator_to_observation_value_as_concept_id,
-                "source_value_converter": clinical_indicator_to_observation_value_source_value,
-                "concept_name_converter": clinical_indicator_to_observation_value_as_concept_name,
+                "value_as_concept_ids": YES_NO_CONCEPT_IDS,
+                "value_source_values": YES_NO_SOURCE_VALUES,
             },
             {
                 "source_column": "trnkcumn",
                 "concept_id": 2000002004,
                 "concept_name": CONCEPT_ID_TO_NAME[2000002004],
                 "source_value": "Trunk upper motor neuron clinical indicator",
-                "value_converter": clinical_indicator_to_observation_value_as_concept_id,
-                "source_value_converter": clinical_indicator_to_observation_value_source_value,
-                "concept_name_converter": clinical_indicator_to_observation_value_as_concept_name,
+                "value_as_concept_ids": YES_NO_CONCEPT_IDS,
+                "value_source_values": YES_NO_SOURCE_VALUES,
             },
             {
                 "source_column": "llecumn",
                 "concept_id": 2000002005,
                 "concept_name": CONCEPT_ID_TO_NAME[2000002005],
                 "source_value": "Left lower extremity upper motor neuron clinical indicator",
-                "value_converter": clinical_indicator_to_observation_value_as_concept_id,
-                "source_value_converter": clinical_indicator_to_observation_value_source_value,
-                "concept_name_converter": clinical_indicator_to_observation_value_as_concept_name,
+                "value_as_concept_ids": YES_NO_CONCEPT_IDS,
+                "value_source_values": YES_NO_SOURCE_VALUES,
             },
             {
                 "source_column": "rlecumn",
                 "concept_id": 2000002006,
                 "concept_name": CONCEPT_ID_TO_NAME[2000002006],
                 "source_value": "Right lower extremity upper motor neuron clinical indicator",
-                "value_converter": clinical_indicator_to_observation_value_as_concept_id,
-                "source_value_converter": clinical_indicator_to_observation_value_source_value,
-                "concept_name_converter": clinical_indicator_to_observation_value_as_concept_name,
+                "value_as_concept_ids": YES_NO_CONCEPT_IDS,
+                "value_source_values": YES_NO_SOURCE_VALUES,
             },
             {
                 "source_column": "blbclmn",
                 "concept_id": 2000000029,
                 "concept_name": CONCEPT_ID_TO_NAME[2000000029],
                 "source_value": "Bulbar lower motor neuron clinical indicator",
-                "value_converter": clinical_indicator_to_observation_value_as_concept_id,
-                "source_value_converter": clinical_indicator_to_observation_value_source_value,
-                "concept_name_converter": clinical_indicator_to_observation_value_as_concept_name,
+                "value_as_concept_ids": YES_NO_CONCEPT_IDS,
+                "value_source_values": YES_NO_SOURCE_VALUES,
             },
             {
                 "source_column": "lueclmn",
                 "concept_id": 2000002007,
                 "concept_name": CONCEPT_ID_TO_NAME[2000002007],
                 "source_value": "Left upper extremity lower motor neuron clinical indicator",
-                "value_converter": clinical_indicator_to_observation_value_as_concept_id,
-                "source_value_converter": clinical_indicator_to_observation_value_source_value,
-                "concept_name_converter": clinical_indicator_to_observation_value_as_concept_name,
+                "value_as_concept_ids": YES_NO_CONCEPT_IDS,
+                "value_source_values": YES_NO_SOURCE_VALUES,
             },
             {
                 "source_column": "rueclmn",
                 "concept_id": 2000002008,
                 "concept_name": CONCEPT_ID_TO_NAME[2000002008],
                 "source_value": "Right upper extremity lower motor neuron clinical indicator",
-                "value_converter": clinical_indicator_to_observation_value_as_concept_id,
-                "source_value_converter": clinical_indicator_to_observation_value_source_value,
-                "concept_name_converter": clinical_indicator_to_observation_value_as_concept_name,
+                "value_as_concept_ids": YES_NO_CONCEPT_IDS,
+                "value_source_values": YES_NO_SOURCE_VALUES,
             },
             {
                 "source_column": "trnkclmn",
                 "concept_id": 2000002009,
                 "concept_name": CONCEPT_ID_TO_NAME[2000002009],
                 "source_value": "Trunk lower motor neuron clinical indicator",
-                "value_converter": clinical_indicator_to_observation_value_as_concept_id,
-                "source_value_converter": clinical_indicator_to_observation_value_source_value,
-                "concept_name_converter": clinical_indicator_to_observation_value_as_concept_name,
+                "value_as_concept_ids": YES_NO_CONCEPT_IDS,
+                "value_source_values": YES_NO_SOURCE_VALUES,
             },
             {
                 "source_column": "lleclmn",
                 "concept_id": 2000002010,
                 "concept_name": CONCEPT_ID_TO_NAME[2000002010],
                 "source_value": "Left lower extremity lower motor neuron clinical indicator",
-                "value_converter": clinical_indicator_to_observation_value_as_concept_id,
-                "source_value_converter": clinical_indicator_to_observation_value_source_value,
-                "concept_name_converter": clinical_indicator_to_observation_value_as_concept_name,
+                "value_as_concept_ids": YES_NO_CONCEPT_IDS,
+                "value_source_values": YES_NO_SOURCE_VALUES,
             },
             {
                 "source_column": "rleclmn",
                 "concept_id": 2000002011,
                 "concept_name": CONCEPT_ID_TO_NAME[2000002011],
                 "source_value": "Right lower extremity lower motor neuron clinical indicator",
-                "value_converter": clinical_indicator_to_observation_value_as_concept_id,
-                "source_value_converter": clinical_indicator_to_observation_value_source_value,
-                "concept_name_converter": clinical_indicator_to_observation_value_as_concept_name,
+                "value_as_concept_ids": YES_NO_CONCEPT_IDS,
+                "value_source_values": YES_NO_SOURCE_VALUES,
             },
             {
                 "source_column": "blbelmn",
                 "concept_id": 2000000030,
                 "concept_name": CONCEPT_ID_TO_NAME[2000000030],
                 "source_value": "Bulbar lower motor neuron electromyogram indicator",
-                "value_converter": emg_indicator_to_observation_value_as_concept_id,
-                "source_value_converter": emg_indicator_to_observation_value_source_value,
-                "concept_name_converter": emg_indicator_to_observation_value_as_concept_name,
+                "value_as_concept_ids": YES_NO_CONCEPT_IDS,
+                "value_source_values": EMG_SOURCE_VALUES,
             },
             {
                 "source_column": "lueelmn",
                 "concept_id": 2000002012,
                 "concept_name": CONCEPT_ID_TO_NAME[2000002012],
                 "source_value": "Left upper extremity lower motor neuron electromyogram indicator",
-                "value_converter": emg_indicator_to_observation_value_as_concept_id,
-                "source_value_converter": emg_indicator_to_observation_value_source_value,
-                "concept_name_converter": emg_indicator_to_observation_value_as_concept_name,
+                "value_as_concept_ids": YES_NO_CONCEPT_IDS,
+                "value_source_values": EMG_SOURCE_VALUES,
             },
             {
                 "source_column": "rueelmn",
                 "concept_id": 2000002013,
                 "concept_name": CONCEPT_ID_TO_NAME[2000002013],
                 "source_value": "Right upper extremity lower motor neuron electromyogram indicator",
-                "value_converter": emg_indicator_to_observation_value_as_concept_id,
-                "source_value_converter": emg_indicator_to_observation_value_source_value,
-                "concept_name_converter": emg_indicator_to_observation_value_as_concept_name,
+                "value_as_concept_ids": YES_NO_CONCEPT_IDS,
+                "value_source_values": EMG_SOURCE_VALUES,
             },
             {
                 "source_column": "trnkelmn",
                 "concept_id": 2000002014,
                 "concept_name": CONCEPT_ID_TO_NAME[2000002014],
                 "source_value": "Trunk lower motor neuron electromyogram indicator",
-                "value_converter": emg_indicator_to_observation_value_as_concept_id,
-                "source_value_converter": emg_indicator_to_observation_value_source_value,
-                "concept_name_converter": emg_indicator_to_observation_value_as_concept_name,
+                "value_as_concept_ids": YES_NO_CONCEPT_IDS,
+                "value_source_values": EMG_SOURCE_VALUES,
             },
             {
                 "source_column": "lleelmn",
                 "concept_id": 2000002015,
                 "concept_name": CONCEPT_ID_TO_NAME[2000002015],
                 "source_value": "Left lower extremity lower motor neuron electromyogram indicator",
-                "value_converter": emg_indicator_to_observation_value_as_concept_id,
-                "source_value_converter": emg_indicator_to_observation_value_source_value,
-                "concept_name_converter": emg_indicator_to_observation_value_as_concept_name,
+                "value_as_concept_ids": YES_NO_CONCEPT_IDS,
+                "value_source_values": EMG_SOURCE_VALUES,
             },
             {
                 "source_column": "rleelmn",
                 "concept_id": 2000002016,
                 "concept_name": CONCEPT_ID_TO_NAME[2000002016],
                 "source_value": "Right lower extremity lower motor neuron electromyogram indicator",
-                "value_converter": emg_indicator_to_observation_value_as_concept_id,
-                "source_value_converter": emg_indicator_to_observation_value_source_value,
-                "concept_name_converter": emg_indicator_to_observation_value_as_concept_name,
+                "value_as_concept_ids": YES_NO_CONCEPT_IDS,
+                "value_source_values": EMG_SOURCE_VALUES,
             },
         ]
 
-        # Process each row in the source data
-        for _, row in df.iterrows():
-            person_id = row["Participant_ID"]
+        # Read source data, loading only the ID/date columns and the item columns
+        used_columns = {"Participant_ID", "Visit_Date", "alsdxdt"}
+        used_columns.update(item["source_column"] for item in observation_items)
+        # alsdxdt and the coded item columns are whole numbers, read as nullable Int64
+        int_columns = used_columns - {"Participant_ID", "Visit_Date"}
+        df = pd.read_csv(
+            source_file,
+            usecols=lambda col: col in used_columns,
+            dtype={col: "Int64" for col in int_columns},
+        )
+        logging.info(f"Successfully read {len(df)} rows from {source_file}")
 
-            # Handle NaN values in alsdxdt
-            if pd.isna(row["alsdxdt"]):
-                visit_occurrence_id = None
-            else:
-                visit_occurrence_id = get_visit_occurrence_id(
-                    person_id, int(row["Visit_Date"])
+        # Per source row: the visit and observation date, only set when alsdxdt is present
+        has_alsdxdt = df["alsdxdt"].notna().to_numpy()
+        dated_rows = df[has_alsdxdt]
+        # Same "{person_id}_{visit_date}" IDs as get_visit_occurrence_id, built for all rows at once
+        visit_occurrence_ids = (
+            dated_rows["Participant_ID"].astype(str)
+            + "_"
+            + dated_rows["Visit_Date"].astype(int).astype(str)
+        ).reindex(df.index)
+        # Observation dates are index_date plus alsdxdt days, computed for all dated rows at once
+        relative_days = dated_rows["alsdxdt"].astype("int64")
+        observation_dates = (
+            pd.Timestamp(index_date) + pd.to_timedelta(relative_days, unit="D")
+        ).reindex(df.index)
+        logging.info("Converted %d alsdxdt relative days to dates", len(relative_days))
+
+        # Columns that only depend on the source column and its value mappings are
+        # mapped once, shared by items that differ only in concept (e.g. the three
+        # alsdx1 items). The source columns are independent, so they are mapped in threads
+        mapping_items = {}
+        for item in observation_items:
+            if item["source_column"] in df.columns:
+                mapping_items.setdefault(item_mapping_key(item), item)
+        # Has-value masks of all the item columns, from a single notna over the block
+        item_columns = list(dict.fromkeys(item["source_column"] for item in mapping_items.values()))
+        has_values = dict(zip(item_columns, df[item_columns].notna().to_numpy().T))
+        with ThreadPoolExecutor() as executor:
+            mapped_columns = dict(
+                zip(
+                    mapping_items,
+                    executor.map(
+                        lambda item: map_item_column(
+                            df,
+                            item,
+                            has_values[item["source_column"]],
+                            observation_dates,
+                            visit_occurrence_ids,
+                        ),
+                        mapping_items.values(),
+                    ),
                 )
-
-            # Process each observation item
-            for item in observation_items:
-                if item["source_column"] in row and pd.notna(
-                    row[item["source_column"]]
-                ):
-                    value = int(row[item["source_column"]])
-                    value_as_concept_id = item["value_converter"](value)
-                    value_source_value = item["source_value_converter"](value)
-
-                    # Calculate observation date from alsdxdt
-                    observation_date = None
-                    if pd.notna(row["alsdxdt"]):
-                        relative_day = int(row["alsdxdt"])
-                        observation_date = relative_day_to_date(
-                            relative_day, index_date
-                        )
-                        logging.info(
-                            f"Converting alsdxdt: {relative_day} to date: {observation_date}"
-                        )
-
-                    # observation_source_value: table+source_column (interpretation) - no value indicates presence of variable led to entry
-                    obs_source_value = f"aalsdxfx+{item['source_column']} ({item['source_value']})"
-                    # value_source_value: table+var: value (interpretation), omit parentheses if interpretation is missing or same as value
-                    var_name = item["source_column"]
-                    if value_source_value and str(value_source_value).strip().lower() != str(value).strip().lower():
-                        val_source_value = f"aalsdxfx+{var_name}: {value} ({value_source_value})"
-                    else:
-                        val_source_value = f"aalsdxfx+{var_name}: {value}"
-                    qualifier_source_value = ""
-                    unit_source_value = ""
-
-                    observation = {
-                        "person_id": person_id,
-                        "observation_concept_id": item["concept_id"],
-                        "observation_source_value": obs_source_value,
-                        "observation_date": observation_date,
-                        "observation_type_concept_id": 32851,  # Healthcare professional filled survey
-                        "value_as_number": "",  # Intentionally empty
-                        "value_as_string": "",  # Intentionally empty
-                        "value_as_concept_id": value_as_concept_id,
-                        "value_source_value": val_source_value,
-                        "qualifier_concept_id": "",  # Intentionally empty
-                        "qualifier_source_value": qualifier_source_value,
-                        "unit_concept_id": "",  # Intentionally empty
-                        "unit_source_value": unit_source_value,
-                        "visit_occurrence_id": visit_occurrence_id,
-                        "observation_event_id": "",  # Intentionally empty
-                        "obs_event_field_concept_id": "",  # Intentionally empty
-                    }
-                    observations.append(observation)
-
-        # Create DataFrame from observations
-        result_df = pd.DataFrame(observations)
+            )
+
+        # Observation columns preallocated for every (source row, item) slot in row-major
+        # order, so the filled slots come out in source row order with items in list order
+        row_count, item_count = len(df), len(observation_items)
+        slot_count = row_count * item_count
+        filled = np.zeros(slot_count, dtype=bool)
+        person_ids = np.empty(slot_count, dtype=object)
+        observation_concept_ids = np.zeros(slot_count, dtype=np.int64)
+        observation_source_values = np.empty(slot_count, dtype=object)
+        observation_date_values = np.empty(slot_count, dtype="datetime64[ns]")
+        value_as_concept_ids = np.zeros(slot_count, dtype=np.int64)
+        value_source_values = np.empty(slot_count, dtype=object)
+        visit_occurrence_id_values = np.empty(slot_count, dtype=object)
+
+        # Fill the slots of each item column-wise from the rows where it has a value
+        for item_index, item in enumerate(observation_items):
+            if item["source_column"] not in df.columns:
+                continue
+
+            var_name = item["source_column"]
+            shared = mapped_columns[item_mapping_key(item)]
+            slots = shared["person_id"].index.to_numpy() * item_count + item_index
+
+            # observation_source_value: table+source_column (interpretation) - no value indicates presence of variable led to entry
+            obs_source_value = f"aalsdxfx+{var_name} ({item['source_value']})"
+
+            filled[slots] = True
+            person_ids[slots] = shared["person_id"].to_numpy()
+            observation_concept_ids[slots] = item["concept_id"]
+            observation_source_values[slots] = obs_source_value
+            observation_date_values[slots] = shared["observation_date"].to_numpy()
+            value_as_concept_ids[slots] = shared["value_as_concept_id"].to_numpy()
+            value_source_values[slots] = shared["value_source_value"].to_numpy()
+            visit_occurrence_id_values[slots] = shared["visit_occurrence_id"].to_numpy()
+
+        # Keep the filled slots, then add the columns that are the same for every observation
+        result_df = (
+            pd.DataFrame(
+                {
+                    "person_id": person_ids[filled],
+                    "observation_concept_id": observation_concept_ids[filled],
+                    "observation_source_value": observation_source_values[filled],
+                    "observation_date": observation_date_values[filled],
+                    "value_as_concept_id": value_as_concept_ids[filled],
+                    "value_source_value": value_source_values[filled],
+                    "visit_occurrence_id": visit_occurrence_id_values[filled],
+                }
+            )
+            .assign(
+                observation_type_concept_id=32851,  # Healthcare professional filled survey
+                value_as_number="",  # Intentionally empty
+                value_as_string="",  # Intentionally empty
+                qualifier_concept_id="",  # Intentionally empty
+                qualifier_source_value="",
+                unit_concept_id="",  # Intentionally empty
+                unit_source_value="",
+                observation_event_id="",  # Intentionally empty
+                obs_event_field_concept_id="",  # Intentionally empty
+            )
+            .reindex(
+                columns=[
+                    "person_id",
+                    "observation_concept_id",
+                    "observation_source_value",
+                    "observation_date",
+                    "observation_type_concept_id",
+                    "value_as_number",
+                    "value_as_string",
+                    "value_as_concept_id",
+                    "value_source_value",
+                    "qualifier_concept_id",
+                    "qualifier_source_value",
+                    "unit_concept_id",
+                    "unit_source_value",
+                    "visit_occurrence_id",
+                    "observation_event_id",
+                    "obs_event_field_concept_id",
+                ]
+            )
+        )
 
         # Check for missing concept IDs only on relevant columns
         concept_columns = [
@@ -559,7 +504,8 @@ def process_aalsdxfx_to_observation(source_file, index_date):
 
         # Save to output file
         output_file = "processed_source/aalsdxfx--observation.csv"
-        result_df.to_csv(output_file, index=False)
+        # Write the observation dates with the fixed OMOP date format
+        result_df.to_csv(output_file, index=False, date_format="%Y-%m-%d")
         logging.info(
             f"Successfully saved {len(result_df)} observations to {output_file}"
         )
@@ -571,10 +517,14 @@ def process_aalsdxfx_to_observation(source_file, index_date):
         raise
 
 
-if __name__ == "__main__":
+def main():
     # Set index date (example: 2016-01-01)
     index_date = datetime(2016, 1, 1)
 
     # Process the data
     source_file = "source_tables/aalsdxfx.csv"
     process_aalsdxfx_to_observation(source_file, index_date)
+
+
+if __name__ == "__main__":
+    main()
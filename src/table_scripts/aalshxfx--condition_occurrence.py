@@ -1,7 +1,8 @@
 import pandas as pd
+import numpy as np
+import functools
 import logging
 from helpers import (
-    relative_day_to_date,
     check_missing_concept_ids,
     get_visit_occurrence_id,
 )
@@ -9,15 +10,20 @@ import os
 from pathlib import Path
 from datetime import datetime
 
-# Load concept mapping
-concept_csv_path = os.path.join("source_tables", "omop_tables", "concept.csv")
-concept_df = pd.read_csv(concept_csv_path, dtype={"concept_id": str})
-concept_id_to_name = dict(zip(concept_df["concept_id"], concept_df["concept_name"]))
-
-# Load subject group mapping
+# Load subject group mapping (on first use rather than at import, and once per process)
 subjects_csv_path = os.path.join("source_tables", "subjects.csv")
-subjects_df = pd.read_csv(subjects_csv_path, dtype={"Participant_ID": str, "subject_group_id": str})
-subject_group_map = dict(zip(subjects_df["Participant_ID"], subjects_df["subject_group_id"]))
+
+
+@functools.lru_cache(maxsize=1)
+def load_subject_group_map():
+    subjects_df = pd.read_csv(
+        subjects_csv_path,
+        usecols=["Participant_ID", "subject_group_id"],
+        dtype={"Participant_ID": str, "subject_group_id": str},
+    )
+    subject_group_map = dict(zip(subjects_df["Participant_ID"], subjects_df["subject_group_id"]))
+    return subject_group_map
+
 
 # Add subject group interpretation mapping
 subject_group_interpretation = {
@@ -31,142 +37,120 @@ logs_dir = os.path.join("logs", "aalshxfx--condition_occurrence.log")
 processed_source_dir = os.path.join("processed_source", "aalshxfx--condition_occurrence.csv")
 source_tables_dir = os.path.join("source_tables", "aalshxfx.csv")
 
-# Set up logging
-logging.basicConfig(
-    filename=logs_dir,
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-)
+
+def format_group_part(subject_group_id):
+    """Format the subject group part of condition_source_value"""
+    group_interp = subject_group_interpretation.get(subject_group_id, "")
+    if group_interp:
+        return f"subjects+subject_group_id: {subject_group_id} ({group_interp})"
+    return f"subjects+subject_group_id: {subject_group_id}"
+
+
+def build_conditions(rows, concept_id, relative_days, source_value, index_date):
+    """Build condition records for rows, dated relative_days from the index date"""
+    return pd.DataFrame(
+        {
+            "person_id": rows["Participant_ID"],
+            "condition_concept_id": concept_id,
+            "condition_source_value": source_value,
+            # Written as full datetimes, as the dates have always been in this table
+            "condition_start_date": (
+                pd.Timestamp(index_date) + pd.to_timedelta(relative_days, unit="D")
+            ).dt.strftime("%Y-%m-%d %H:%M:%S"),
+            "condition_type_concept_id": 32851,
+            "visit_occurrence_id": rows["visit_occurrence_id"],
+        },
+        index=rows.index,
+    )
 
 
 def main():
+    # Set up logging when the ETL runs, not when the module is loaded
+    os.makedirs(os.path.dirname(logs_dir), exist_ok=True)
+    logging.basicConfig(
+        filename=logs_dir,
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
+
     try:
         # Read source data
         source_data = pd.read_csv(source_tables_dir)
 
-        # Initialize output dataframe
-        output_columns = [
-            "person_id",
-            "condition_concept_id",
-            "condition_source_value",
-            "condition_start_date",
-            "condition_type_concept_id",
-            "visit_occurrence_id",
-        ]
-        output_data = pd.DataFrame(columns=output_columns)
-
         # Set index date
         index_date = datetime.strptime("2016-01-01", "%Y-%m-%d")
 
-        # Process each row
-        for _, row in source_data.iterrows():
-            # Get person_id
-            person_id = row["Participant_ID"]
-            subject_group_id = subject_group_map.get(person_id)
-            if subject_group_id is None:
-                continue  # skip if no group info
-
-            # ALS group
-            if subject_group_id == "1":
-                # Process diagnosis date
-                # Fill empty diagdt with 1900-01-01
-                diagdt_value = row.get("diagdt")
-                if pd.isna(diagdt_value):
-                    # Calculate days from 1900-01-01 to 2016-01-01 (index_date)
-                    # 1900-01-01 is 42368 days before 2016-01-01
-                    diagdt_value = -42368
-                
-                condition_start_date = relative_day_to_date(diagdt_value, index_date)
-                diagnosis_concept_id = "373182"
-                group_interp = subject_group_interpretation.get(subject_group_id, "")
-                if group_interp:
-                    group_part = f"subjects+subject_group_id: {subject_group_id} ({group_interp})"
-                else:
-                    group_part = f"subjects+subject_group_id: {subject_group_id}"
-                # Show original value in source, or indicate if it was blank
-                original_diagdt = row.get("diagdt")
-                if pd.isna(original_diagdt):
-                    diagdt_display = "BLANK (filled with 1900-01-01)"
-                else:
-                    diagdt_display = f"{int(original_diagdt)} (days since screening)"
-                condition_source_value = f"{group_part} | aalshxfx+diagdt (Date of ALS diagnosis): {diagdt_display}"
-                output_data = pd.concat(
-                    [
-                        output_data,
-                        pd.DataFrame(
-                            [
-                                {
-                                    "person_id": person_id,
-                                    "condition_concept_id": diagnosis_concept_id,
-                                    "condition_source_value": condition_source_value,
-                                    "condition_start_date": condition_start_date,
-                                    "condition_type_concept_id": 32851,
-                                    "visit_occurrence_id": f"{person_id}_{row['Visit_Date']}",
-                                }
-                            ]
-                        ),
-                    ],
-                    ignore_index=True,
-                )
-                # Process ALS symptom onset date
-                if pd.notna(row.get("onsetdt")):
-                    condition_start_date = relative_day_to_date(row["onsetdt"], index_date)
-                    onset_concept_id = "2000000397"
-                    group_interp = subject_group_interpretation.get(subject_group_id, "")
-                    if group_interp:
-                        group_part = f"subjects+subject_group_id: {subject_group_id} ({group_interp})"
-                    else:
-                        group_part = f"subjects+subject_group_id: {subject_group_id}"
-                    condition_source_value = f"{group_part} | aalshxfx+onsetdt (Date of ALS symptom onset): {int(row['onsetdt'])} (days since screening)"
-                    output_data = pd.concat(
-                        [
-                            output_data,
-                            pd.DataFrame(
-                                [
-                                    {
-                                        "person_id": person_id,
-                                        "condition_concept_id": onset_concept_id,
-                                        "condition_source_value": condition_source_value,
-                                        "condition_start_date": condition_start_date,
-                                        "condition_type_concept_id": 32851,
-                                        "visit_occurrence_id": f"{person_id}_{row['Visit_Date']}",
-                                    }
-                                ]
-                            ),
-                        ],
-                        ignore_index=True,
-                    )
-            # Non-ALS MND group
-            elif subject_group_id == "17":
-                # Only process MND symptom onset (no diagnosis)
-                if pd.notna(row.get("onsetdt")):
-                    condition_start_date = relative_day_to_date(row["onsetdt"], index_date)
-                    onset_concept_id = "2000002019"
-                    group_interp = subject_group_interpretation.get(subject_group_id, "")
-                    if group_interp:
-                        group_part = f"subjects+subject_group_id: {subject_group_id} ({group_interp})"
-                    else:
-                        group_part = f"subjects+subject_group_id: {subject_group_id}"
-                    condition_source_value = f"{group_part} | aalshxfx+onsetdt (Date of MND symptom onset): {int(row['onsetdt'])} (days since screening)"
-                    output_data = pd.concat(
-                        [
-                            output_data,
-                            pd.DataFrame(
-                                [
-                                    {
-                                        "person_id": person_id,
-                                        "condition_concept_id": onset_concept_id,
-                                        "condition_source_value": condition_source_value,
-                                        "condition_start_date": condition_start_date,
-                                        "condition_type_concept_id": 32851,
-                                        "visit_occurrence_id": f"{person_id}_{row['Visit_Date']}",
-                                    }
-                                ]
-                            ),
-                        ],
-                        ignore_index=True,
+        # Subject group of each row, as a categorical so the group comparisons run on the
+        # integer codes. Rows without group info and all other groups are dropped in one
+        # filter, then the rest is split into the ALS and Non-ALS MND groups
+        subject_group_ids = source_data["Participant_ID"].map(load_subject_group_map()).astype("category")
+        in_groups = subject_group_ids.isin(["1", "17"])
+        source_data = source_data[in_groups]
+        subject_group_ids = subject_group_ids[in_groups]
+
+        # Visit of each kept source row, shared by all conditions from that row; str() of
+        # each Visit_Date, so a blank one still gives "{person_id}_nan"
+        source_data = source_data.assign(
+            visit_occurrence_id=source_data["Participant_ID"].astype(str)
+            + "_"
+            + source_data["Visit_Date"].map(str)
+        )
+
+        als_rows = source_data[subject_group_ids == "1"]
+        mnd_rows = source_data[subject_group_ids == "17"]
+
+        # ALS group: diagnosis for every row, empty diagdt filled with 1900-01-01
+        # (42368 days before 2016-01-01, the index_date)
+        if "diagdt" in als_rows.columns:
+            diagdt = als_rows["diagdt"]
+        else:
+            diagdt = pd.Series(float("nan"), index=als_rows.index)
+        # Show original value in source, or indicate if it was blank
+        diagdt_display = pd.Series(
+            np.where(
+                diagdt.isna(),
+                "BLANK (filled with 1900-01-01)",
+                diagdt.fillna(0).astype("int64").astype(str) + " (days since screening)",
+            ),
+            index=als_rows.index,
+        )
+        conditions = [
+            build_conditions(
+                als_rows,
+                "373182",
+                diagdt.fillna(-42368),
+                f"{format_group_part('1')} | aalshxfx+diagdt (Date of ALS diagnosis): " + diagdt_display,
+                index_date,
+            )
+        ]
+
+        # Symptom onset where onsetdt is present: ALS onset for the ALS group,
+        # MND onset (no diagnosis) for the Non-ALS MND group
+        if "onsetdt" in source_data.columns:
+            for rows, subject_group_id, concept_id, label in [
+                (als_rows, "1", "2000000397", "Date of ALS symptom onset"),
+                (mnd_rows, "17", "2000002019", "Date of MND symptom onset"),
+            ]:
+                onset_rows = rows[rows["onsetdt"].notna()]
+                onsetdt = onset_rows["onsetdt"]
+                conditions.append(
+                    build_conditions(
+                        onset_rows,
+                        concept_id,
+                        onsetdt,
+                        f"{format_group_part(subject_group_id)} | aalshxfx+onsetdt ({label}): "
+                        + onsetdt.astype("int64").astype(str)
+                        + " (days since screening)",
+                        index_date,
                     )
-            # All other groups: skip
+                )
+
+        # Back into source row order (diagnosis before onset within a row)
+        output_data = (
+            pd.concat(conditions)
+            .sort_index(kind="stable")
+            .reset_index(drop=True)
+        )
 
         # Check for missing concept IDs
         check_missing_concept_ids(output_data, ["condition_concept_id"])
@@ -1,7 +1,7 @@
 import pandas as pd
+import numpy as np
 import logging
 from helpers import (
-    relative_day_to_date,
     check_missing_concept_ids,
     get_visit_occurrence_id,
 )
@@ -25,13 +25,23 @@ logging.basicConfig(
 
 # Load concept mapping
 concept_csv_path = os.path.join("source_tables", "omop_tables", "concept.csv")
-concept_df = pd.read_csv(concept_csv_path, dtype={"concept_id": str})
+concept_df = pd.read_csv(
+    concept_csv_path, usecols=["concept_id", "concept_name"], dtype={"concept_id": str}
+)
+# Only the bulbar dysfunction concept is looked up (the last row wins for a repeated concept_id)
+concept_df = concept_df[concept_df["concept_id"] == "2000002017"]
 concept_id_to_name = dict(zip(concept_df["concept_id"], concept_df["concept_name"]))
+del concept_df
 
 # Load subject group mapping
 subjects_csv_path = os.path.join("source_tables", "subjects.csv")
-subjects_df = pd.read_csv(subjects_csv_path, dtype={"Participant_ID": str, "subject_group_id": str})
+subjects_df = pd.read_csv(
+    subjects_csv_path,
+    usecols=["Participant_ID", "subject_group_id"],
+    dtype={"Participant_ID": str, "subject_group_id": str},
+)
 subject_group_map = dict(zip(subjects_df["Participant_ID"], subjects_df["subject_group_id"]))
+del subjects_df
 
 # Add subject group interpretation mapping
 subject_group_interpretation = {
@@ -39,6 +49,12 @@ subject_group_interpretation = {
     "17": "Non-ALS MND",
 }
 
+# observation_source_value prefix for each subject group
+GROUP_PART = {
+    subject_group_id: f"subjects+subject_group_id: {subject_group_id} ({interpretation})"
+    for subject_group_id, interpretation in subject_group_interpretation.items()
+}
+
 # Mapping of source variables to their corresponding concept IDs and names
 SITE_MAPPINGS = {
     "hxgen": {
@@ -144,20 +160,16 @@ SITE_MAPPINGS = {
 SITE_MAPPINGS["hxblb"]["concept_id"] = "2000002017"
 SITE_MAPPINGS["hxblb"]["concept_name"] = concept_id_to_name["2000002017"]
 
-
-def check_limb_combination(row, side_var, part_vars):
-    """
-    Check if a limb combination is valid (e.g., left upper + hand/arm)
-    Args:
-        row: The data row
-        side_var: The side variable (e.g., 'hxliul' for left upper)
-        part_vars: List of part variables to check (e.g., ['hxliuhnd', 'hxliuarm'])
-    Returns:
-        bool: True if the combination is valid
-    """
-    if row.get(side_var) != 1:
-        return False
-    return any(row.get(part_var) == 1 for part_var in part_vars)
+# (concept_id, source_value) pairs of each site variable; a variable with a single
+# concept has one pair, limb parts have a [left, right] pair
+SITE_PAIRS = {
+    site_var: (
+        list(zip(mapping["concept_id"], mapping["source_value"]))
+        if isinstance(mapping["concept_id"], list)
+        else [(mapping["concept_id"], mapping["source_value"])]
+    )
+    for site_var, mapping in SITE_MAPPINGS.items()
+}
 
 
 # Formatting function for *_source_value fields
@@ -183,412 +195,152 @@ def format_source_value(table, var, var_interpretation, value, value_interpretat
         return left
 
 
+# Limb sides and the part variables recorded with them; each part maps to its
+# [left, right] concepts, picked by the side's index
+LIMB_COMBINATIONS = [
+    ("hxliul", ["hxliuhnd", "hxliuarm"], 0),
+    ("hxliur", ["hxliuhnd", "hxliuarm"], 1),
+    ("hxlill", ["hxlilft", "hxlilleg"], 0),
+    ("hxlilr", ["hxlilft", "hxlilleg"], 1),
+]
+
+
+def build_site_records():
+    """
+    List the site-of-onset records a source row can produce, in the order they are
+    emitted for a row: (site_var, required variables, value_as_concept_id,
+    value_source_value). A record is produced when all of its required variables are 1.
+    """
+    limb_parts = {part for _, parts, _ in LIMB_COMBINATIONS for part in parts}
+    site_records = []
+    for site_var, pairs in SITE_PAIRS.items():
+        # Limb parts are only recorded together with a limb side, below
+        if site_var in limb_parts:
+            continue
+        for concept_id, source_value in pairs:
+            site_records.append(
+                (site_var, [site_var], concept_id, f"aalshxfx+{site_var} ({source_value}): 1 (Yes)")
+            )
+    for side_var, part_vars, side_index in LIMB_COMBINATIONS:
+        for part_var in part_vars:
+            concept_id, source_value = SITE_PAIRS[part_var][side_index]
+            site_records.append(
+                (part_var, [side_var, part_var], concept_id, f"aalshxfx+{part_var} ({source_value}): 1 (Yes)")
+            )
+    # Other: exactly one entry when hxot is 1 (the hxotsp text is added per row)
+    site_records.append(("hxot", ["hxot"], 9177, "aalshxfx+hxot: Other"))
+    return site_records
+
+
+def is_one(source_data, column):
+    """Rows where a source variable is 1 (never, if the variable is missing)"""
+    if column not in source_data.columns:
+        return np.zeros(len(source_data), dtype=bool)
+    return (source_data[column] == 1).to_numpy()
+
+
 def main():
     try:
-        # Read source data
-        source_data = pd.read_csv(os.path.join("source_tables", "aalshxfx.csv"))
+        # Read source data: only the columns used, with the yes/no flags read as
+        # floats (they are only compared to 1). Visit_Date and hxotsp keep their
+        # inferred types since they are written out as text
+        flag_columns = list(SITE_MAPPINGS) + ["hxot"]
+        used_columns = {"Participant_ID", "Visit_Date", "hxotsp", *flag_columns}
+        source_data = pd.read_csv(
+            os.path.join("source_tables", "aalshxfx.csv"),
+            usecols=lambda col: col in used_columns,
+            dtype={"Participant_ID": str, **{col: "float32" for col in flag_columns}},
+        )
         logging.info(f"Read source data with {len(source_data)} rows")
 
-        # Initialize list to store records
-        records = []
-
         # Set index date
         index_date = datetime.strptime("2016-01-01", "%Y-%m-%d")
 
-        # Process each row
-        for _, row in source_data.iterrows():
-            # Get person_id
-            person_id = row["Participant_ID"]
-            subject_group_id = subject_group_map.get(person_id)
-            if subject_group_id not in ("1", "17"):
-                continue  # Only process ALS or MND
-
-            # Determine concept for anatomical site of symptom onset
-            if subject_group_id == "1":
-                site_concept_id = "2000000396"
-            elif subject_group_id == "17":
-                site_concept_id = "2000002018"
-
-            # Process each site variable
-            for site_var, mapping in SITE_MAPPINGS.items():
-                # Skip specific limb parts that need combination checks
-                if site_var in ["hxliuhnd", "hxliuarm", "hxlilft", "hxlilleg"]:
-                    continue
-
-                # Only create entry if value is 1
-                if row.get(site_var) == 1:
-                    group_interp = subject_group_interpretation.get(subject_group_id, "")
-                    if group_interp:
-                        group_part = f"subjects+subject_group_id: {subject_group_id} ({group_interp})"
-                    else:
-                        group_part = f"subjects+subject_group_id: {subject_group_id}"
-                    obs_source_value = f"{group_part} | aalshxfx+{site_var} (Site of onset)"
-                    if isinstance(mapping["concept_id"], list):
-                        for i in range(len(mapping["concept_id"])):
-                            value_source_value = f"aalshxfx+{site_var} ({mapping['source_value'][i]}): 1 (Yes)"
-                            records.append(
-                                {
-                                    "person_id": person_id,
-                                    "observation_concept_id": site_concept_id,
-                                    "observation_source_value": obs_source_value,
-                                    "observation_date": relative_day_to_date(
-                                        row["Visit_Date"], index_date
-                                    ),
-                                    "observation_type_concept_id": 32851,
-                                    "value_as_number": None,
-                                    "value_as_string": None,
-                                    "value_as_concept_id": mapping["concept_id"][i],
-                                    "value_source_value": value_source_value,
-                                    "qualifier_concept_id": None,
-                                    "qualifier_source_value": None,
-                                    "unit_concept_id": None,
-                                    "unit_source_value": None,
-                                    "visit_occurrence_id": get_visit_occurrence_id(
-                                        person_id, row["Visit_Date"]
-                                    ),
-                                    "observation_event_id": None,
-                                    "obs_event_field_concept_id": None,
-                                }
-                            )
-                    else:
-                        value_source_value = f"aalshxfx+{site_var} ({mapping['source_value']}): 1 (Yes)"
-                        records.append(
-                            {
-                                "person_id": person_id,
-                                "observation_concept_id": site_concept_id,
-                                "observation_source_value": obs_source_value,
-                                "observation_date": relative_day_to_date(
-                                    row["Visit_Date"], index_date
-                                ),
-                                "observation_type_concept_id": 32851,
-                                "value_as_number": None,
-                                "value_as_string": None,
-                                "value_as_concept_id": mapping["concept_id"],
-                                "value_source_value": value_source_value,
-                                "qualifier_concept_id": None,
-                                "qualifier_source_value": None,
-                                "unit_concept_id": None,
-                                "unit_source_value": None,
-                                "visit_occurrence_id": get_visit_occurrence_id(
-                                    person_id, row["Visit_Date"]
-                                ),
-                                "observation_event_id": None,
-                                "obs_event_field_concept_id": None,
-                            }
-                        )
-
-            # Handle upper limb combinations
-            if check_limb_combination(row, "hxliul", ["hxliuhnd", "hxliuarm"]):
-                if row.get("hxliuhnd") == 1:
-                    mapping = SITE_MAPPINGS["hxliuhnd"]
-                    group_interp = subject_group_interpretation.get(subject_group_id, "")
-                    if group_interp:
-                        group_part = f"subjects+subject_group_id: {subject_group_id} ({group_interp})"
-                    else:
-                        group_part = f"subjects+subject_group_id: {subject_group_id}"
-                    obs_source_value = f"{group_part} | aalshxfx+hxliuhnd (Site of onset)"
-                    value_source_value = f"aalshxfx+hxliuhnd ({mapping['source_value'][0]}): 1 (Yes)"
-                    records.append(
-                        {
-                            "person_id": person_id,
-                            "observation_concept_id": site_concept_id,
-                            "observation_source_value": obs_source_value,
-                            "observation_date": relative_day_to_date(
-                                row["Visit_Date"], index_date
-                            ),
-                            "observation_type_concept_id": 32851,
-                            "value_as_number": None,
-                            "value_as_string": None,
-                            "value_as_concept_id": mapping["concept_id"][0],
-                            "value_source_value": value_source_value,
-                            "qualifier_concept_id": None,
-                            "qualifier_source_value": None,
-                            "unit_concept_id": None,
-                            "unit_source_value": None,
-                            "visit_occurrence_id": get_visit_occurrence_id(
-                                person_id, row["Visit_Date"]
-                            ),
-                            "observation_event_id": None,
-                            "obs_event_field_concept_id": None,
-                        }
-                    )
-                if row.get("hxliuarm") == 1:
-                    mapping = SITE_MAPPINGS["hxliuarm"]
-                    group_interp = subject_group_interpretation.get(subject_group_id, "")
-                    if group_interp:
-                        group_part = f"subjects+subject_group_id: {subject_group_id} ({group_interp})"
-                    else:
-                        group_part = f"subjects+subject_group_id: {subject_group_id}"
-                    obs_source_value = f"{group_part} | aalshxfx+hxliuarm (Site of onset)"
-                    value_source_value = f"aalshxfx+hxliuarm ({mapping['source_value'][0]}): 1 (Yes)"
-                    records.append(
-                        {
-                            "person_id": person_id,
-                            "observation_concept_id": site_concept_id,
-                            "observation_source_value": obs_source_value,
-                            "observation_date": relative_day_to_date(
-                                row["Visit_Date"], index_date
-                            ),
-                            "observation_type_concept_id": 32851,
-                            "value_as_number": None,
-                            "value_as_string": None,
-                            "value_as_concept_id": mapping["concept_id"][0],
-                            "value_source_value": value_source_value,
-                            "qualifier_concept_id": None,
-                            "qualifier_source_value": None,
-                            "unit_concept_id": None,
-                            "unit_source_value": None,
-                            "visit_occurrence_id": get_visit_occurrence_id(
-                                person_id, row["Visit_Date"]
-                            ),
-                            "observation_event_id": None,
-                            "obs_event_field_concept_id": None,
-                        }
-                    )
-
-            if check_limb_combination(row, "hxliur", ["hxliuhnd", "hxliuarm"]):
-                if row.get("hxliuhnd") == 1:
-                    mapping = SITE_MAPPINGS["hxliuhnd"]
-                    group_interp = subject_group_interpretation.get(subject_group_id, "")
-                    if group_interp:
-                        group_part = f"subjects+subject_group_id: {subject_group_id} ({group_interp})"
-                    else:
-                        group_part = f"subjects+subject_group_id: {subject_group_id}"
-                    obs_source_value = f"{group_part} | aalshxfx+hxliuhnd (Site of onset)"
-                    value_source_value = f"aalshxfx+hxliuhnd ({mapping['source_value'][1]}): 1 (Yes)"
-                    records.append(
-                        {
-                            "person_id": person_id,
-                            "observation_concept_id": site_concept_id,
-                            "observation_source_value": obs_source_value,
-                            "observation_date": relative_day_to_date(
-                                row["Visit_Date"], index_date
-                            ),
-                            "observation_type_concept_id": 32851,
-                            "value_as_number": None,
-                            "value_as_string": None,
-                            "value_as_concept_id": mapping["concept_id"][1],
-                            "value_source_value": value_source_value,
-                            "qualifier_concept_id": None,
-                            "qualifier_source_value": None,
-                            "unit_concept_id": None,
-                            "unit_source_value": None,
-                            "visit_occurrence_id": get_visit_occurrence_id(
-                                person_id, row["Visit_Date"]
-                            ),
-                            "observation_event_id": None,
-                            "obs_event_field_concept_id": None,
-                        }
-                    )
-                if row.get("hxliuarm") == 1:
-                    mapping = SITE_MAPPINGS["hxliuarm"]
-                    group_interp = subject_group_interpretation.get(subject_group_id, "")
-                    if group_interp:
-                        group_part = f"subjects+subject_group_id: {subject_group_id} ({group_interp})"
-                    else:
-                        group_part = f"subjects+subject_group_id: {subject_group_id}"
-                    obs_source_value = f"{group_part} | aalshxfx+hxliuarm (Site of onset)"
-                    value_source_value = f"aalshxfx+hxliuarm ({mapping['source_value'][1]}): 1 (Yes)"
-                    records.append(
-                        {
-                            "person_id": person_id,
-                            "observation_concept_id": site_concept_id,
-                            "observation_source_value": obs_source_value,
-                            "observation_date": relative_day_to_date(
-                                row["Visit_Date"], index_date
-                            ),
-                            "observation_type_concept_id": 32851,
-                            "value_as_number": None,
-                            "value_as_string": None,
-                            "value_as_concept_id": mapping["concept_id"][1],
-                            "value_source_value": value_source_value,
-                            "qualifier_concept_id": None,
-                            "qualifier_source_value": None,
-                            "unit_concept_id": None,
-                            "unit_source_value": None,
-                            "visit_occurrence_id": get_visit_occurrence_id(
-                                person_id, row["Visit_Date"]
-                            ),
-                            "observation_event_id": None,
-                            "obs_event_field_concept_id": None,
-                        }
-                    )
-
-            # Handle lower limb combinations
-            if check_limb_combination(row, "hxlill", ["hxlilft", "hxlilleg"]):
-                if row.get("hxlilft") == 1:
-                    mapping = SITE_MAPPINGS["hxlilft"]
-                    group_interp = subject_group_interpretation.get(subject_group_id, "")
-                    if group_interp:
-                        group_part = f"subjects+subject_group_id: {subject_group_id} ({group_interp})"
-                    else:
-                        group_part = f"subjects+subject_group_id: {subject_group_id}"
-                    obs_source_value = f"{group_part} | aalshxfx+hxlilft (Site of onset)"
-                    value_source_value = f"aalshxfx+hxlilft ({mapping['source_value'][0]}): 1 (Yes)"
-                    records.append(
-                        {
-                            "person_id": person_id,
-                            "observation_concept_id": site_concept_id,
-                            "observation_source_value": obs_source_value,
-                            "observation_date": relative_day_to_date(
-                                row["Visit_Date"], index_date
-                            ),
-                            "observation_type_concept_id": 32851,
-                            "value_as_number": None,
-                            "value_as_string": None,
-                            "value_as_concept_id": mapping["concept_id"][0],
-                            "value_source_value": value_source_value,
-                            "qualifier_concept_id": None,
-                            "qualifier_source_value": None,
-                            "unit_concept_id": None,
-                            "unit_source_value": None,
-                            "visit_occurrence_id": get_visit_occurrence_id(
-                                person_id, row["Visit_Date"]
-                            ),
-                            "observation_event_id": None,
-                            "obs_event_field_concept_id": None,
-                        }
-                    )
-                if row.get("hxlilleg") == 1:
-                    mapping = SITE_MAPPINGS["hxlilleg"]
-                    group_interp = subject_group_interpretation.get(subject_group_id, "")
-                    if group_interp:
-                        group_part = f"subjects+subject_group_id: {subject_group_id} ({group_interp})"
-                    else:
-                        group_part = f"subjects+subject_group_id: {subject_group_id}"
-                    obs_source_value = f"{group_part} | aalshxfx+hxlilleg (Site of onset)"
-                    value_source_value = f"aalshxfx+hxlilleg ({mapping['source_value'][0]}): 1 (Yes)"
-                    records.append(
-                        {
-                            "person_id": person_id,
-                            "observation_concept_id": site_concept_id,
-                            "observation_source_value": obs_source_value,
-                            "observation_date": relative_day_to_date(
-                                row["Visit_Date"], index_date
-                            ),
-                            "observation_type_concept_id": 32851,
-                            "value_as_number": None,
-                            "value_as_string": None,
-                            "value_as_concept_id": mapping["concept_id"][0],
-                            "value_source_value": value_source_value,
-                            "qualifier_concept_id": None,
-                            "qualifier_source_value": None,
-                            "unit_concept_id": None,
-                            "unit_source_value": None,
-                            "visit_occurrence_id": get_visit_occurrence_id(
-                                person_id, row["Visit_Date"]
-                            ),
-                            "observation_event_id": None,
-                            "obs_event_field_concept_id": None,
-                        }
-                    )
-
-            if check_limb_combination(row, "hxlilr", ["hxlilft", "hxlilleg"]):
-                if row.get("hxlilft") == 1:
-                    mapping = SITE_MAPPINGS["hxlilft"]
-                    group_interp = subject_group_interpretation.get(subject_group_id, "")
-                    if group_interp:
-                        group_part = f"subjects+subject_group_id: {subject_group_id} ({group_interp})"
-                    else:
-                        group_part = f"subjects+subject_group_id: {subject_group_id}"
-                    obs_source_value = f"{group_part} | aalshxfx+hxlilft (Site of onset)"
-                    value_source_value = f"aalshxfx+hxlilft ({mapping['source_value'][1]}): 1 (Yes)"
-                    records.append(
-                        {
-                            "person_id": person_id,
-                            "observation_concept_id": site_concept_id,
-                            "observation_source_value": obs_source_value,
-                            "observation_date": relative_day_to_date(
-                                row["Visit_Date"], index_date
-                            ),
-                            "observation_type_concept_id": 32851,
-                            "value_as_number": None,
-                            "value_as_string": None,
-                            "value_as_concept_id": mapping["concept_id"][1],
-                            "value_source_value": value_source_value,
-                            "qualifier_concept_id": None,
-                            "qualifier_source_value": None,
-                            "unit_concept_id": None,
-                            "unit_source_value": None,
-                            "visit_occurrence_id": get_visit_occurrence_id(
-                                person_id, row["Visit_Date"]
-                            ),
-                            "observation_event_id": None,
-                            "obs_event_field_concept_id": None,
-                        }
-                    )
-                if row.get("hxlilleg") == 1:
-                    mapping = SITE_MAPPINGS["hxlilleg"]
-                    group_interp = subject_group_interpretation.get(subject_group_id, "")
-                    if group_interp:
-                        group_part = f"subjects+subject_group_id: {subject_group_id} ({group_interp})"
-                    else:
-                        group_part = f"subjects+subject_group_id: {subject_group_id}"
-                    obs_source_value = f"{group_part} | aalshxfx+hxlilleg (Site of onset)"
-                    value_source_value = f"aalshxfx+hxlilleg ({mapping['source_value'][1]}): 1 (Yes)"
-                    records.append(
-                        {
-                            "person_id": person_id,
-                            "observation_concept_id": site_concept_id,
-                            "observation_source_value": obs_source_value,
-                            "observation_date": relative_day_to_date(
-                                row["Visit_Date"], index_date
-                            ),
-                            "observation_type_concept_id": 32851,
-                            "value_as_number": None,
-                            "value_as_string": None,
-                            "value_as_concept_id": mapping["concept_id"][1],
-                            "value_source_value": value_source_value,
-                            "qualifier_concept_id": None,
-                            "qualifier_source_value": None,
-                            "unit_concept_id": None,
-                            "unit_source_value": None,
-                            "visit_occurrence_id": get_visit_occurrence_id(
-                                person_id, row["Visit_Date"]
-                            ),
-                            "observation_event_id": None,
-                            "obs_event_field_concept_id": None,
-                        }
-                    )
-
-            # Handle Other case - create exactly one entry when hxot is 1
-            if row.get("hxot") == 1:
-                # Get the text from hxotsp if it exists
-                value_source_value = "aalshxfx+hxot: Other"
-                if pd.notna(row.get("hxotsp")):
-                    value_source_value = f"aalshxfx+hxot: Other: {str(row['hxotsp']).strip()}"
-
-                # Create single Other entry
-                group_interp = subject_group_interpretation.get(subject_group_id, "")
-                if group_interp:
-                    group_part = f"subjects+subject_group_id: {subject_group_id} ({group_interp})"
-                else:
-                    group_part = f"subjects+subject_group_id: {subject_group_id}"
-                obs_source_value = f"{group_part} | aalshxfx+hxot (Site of onset)"
-                records.append(
-                    {
-                        "person_id": person_id,
-                        "observation_concept_id": site_concept_id,
-                        "observation_source_value": obs_source_value,
-                        "observation_date": relative_day_to_date(
-                            row["Visit_Date"], index_date
-                        ),
-                        "observation_type_concept_id": 32851,
-                        "value_as_number": None,
-                        "value_as_string": None,
-                        "value_as_concept_id": 9177,
-                        "value_source_value": value_source_value,
-                        "qualifier_concept_id": None,
-                        "qualifier_source_value": None,
-                        "unit_concept_id": None,
-                        "unit_source_value": None,
-                        "visit_occurrence_id": get_visit_occurrence_id(
-                            person_id, row["Visit_Date"]
-                        ),
-                        "observation_event_id": None,
-                        "obs_event_field_concept_id": None,
-                    }
-                )
+        # Only process ALS or MND: other rows are dropped before any records are built
+        subject_group_ids = source_data["Participant_ID"].map(subject_group_map)
+        in_group = subject_group_ids.isin(["1", "17"]).to_numpy()
+        source_data = source_data[in_group]
+        is_als = (subject_group_ids[in_group] == "1").to_numpy()
+
+        # One column per possible record: whether each source row produces it. The
+        # (row, record) pairs of a row-major nonzero come out in the order the records
+        # were emitted row by row
+        site_records = build_site_records()
+        produced = np.column_stack(
+            [
+                np.logical_and.reduce([is_one(source_data, column) for column in required])
+                for _, required, _, _ in site_records
+            ]
+        )
+        row_index, record_index = np.nonzero(produced)
+
+        # Per source row values, taken for each record of the row
+        person_ids = source_data["Participant_ID"].to_numpy()
+        # Determine concept for anatomical site of symptom onset
+        site_concept_ids = np.where(is_als, "2000000396", "2000002018")
+        group_parts = np.where(is_als, GROUP_PART["1"], GROUP_PART["17"])
+        # Relative days to dates in one step; a missing Visit_Date gives no date
+        observation_dates = (
+            pd.Timestamp(index_date) + pd.to_timedelta(source_data["Visit_Date"], unit="D")
+        ).to_numpy()
+        # The visit id helper only runs for rows that produce records
+        visit_dates = source_data["Visit_Date"].tolist()
+        visit_occurrence_ids = np.empty(len(source_data), dtype=object)
+        for row in np.unique(row_index):
+            visit_occurrence_ids[row] = get_visit_occurrence_id(person_ids[row], visit_dates[row])
+
+        # Per record values
+        site_vars = np.array([site_var for site_var, _, _, _ in site_records], dtype=object)
+        observation_source_suffixes = np.array(
+            [f" | aalshxfx+{site_var} (Site of onset)" for site_var, _, _, _ in site_records],
+            dtype=object,
+        )
+        value_as_concept_ids = np.array(
+            [concept_id for _, _, concept_id, _ in site_records], dtype=object
+        )
+        value_source_values = np.array(
+            [value_source_value for _, _, _, value_source_value in site_records], dtype=object
+        )
+
+        record_site_vars = site_vars[record_index]
+        record_value_source_values = value_source_values[record_index]
+        # Other records get the hxotsp text when it exists
+        if "hxotsp" in source_data.columns:
+            hxotsp = source_data["hxotsp"].to_numpy()[row_index]
+            has_other_text = (record_site_vars == "hxot") & pd.notna(hxotsp)
+            record_value_source_values[has_other_text] = (
+                "aalshxfx+hxot: Other: "
+                + pd.Series(hxotsp[has_other_text], dtype=object).astype(str).str.strip()
+            ).to_numpy()
+
+        # Repeated source rows (same participant and visit) produce the same records.
+        # The participant, visit day and value_source_value (which identifies the record
+        # and carries the Other text) decide every output column, so duplicates are
+        # dropped on those before the output strings are built
+        is_first = ~pd.DataFrame(
+            {
+                "person_id": person_ids[row_index],
+                "visit_date": source_data["Visit_Date"].to_numpy()[row_index],
+                "value_source_value": record_value_source_values,
+            }
+        ).duplicated().to_numpy()
+        row_index = row_index[is_first]
+        record_index = record_index[is_first]
+        record_value_source_values = record_value_source_values[is_first]
+
+        records = pd.DataFrame(
+            {
+                "person_id": person_ids[row_index],
+                "observation_concept_id": site_concept_ids[row_index],
+                "observation_source_value": pd.Series(group_parts[row_index], dtype=object)
+                + observation_source_suffixes[record_index],
+                "observation_date": observation_dates[row_index],
+                "observation_type_concept_id": 32851,
+                "value_as_concept_id": value_as_concept_ids[record_index],
+                "value_source_value": record_value_source_values,
+                "visit_occurrence_id": visit_occurrence_ids[row_index],
+            }
+        )
 
         # Create DataFrame from records with specified column order
         column_order = [
@@ -610,8 +362,8 @@ def main():
             "obs_event_field_concept_id",
         ]
 
-        # Remove any duplicate rows that might have been created
-        output_data = pd.DataFrame(records)[column_order].drop_duplicates()
+        # The columns that are never filled are added empty here
+        output_data = records.reindex(columns=column_order)
         logging.info(f"Created output DataFrame with {len(output_data)} rows")
 
         # Check for missing concept IDs
@@ -1,8 +1,8 @@
 import pandas as pd
+import numpy as np
 import logging
 from datetime import datetime
 from helpers import (
-    relative_day_to_date,
     check_missing_concept_ids,
     get_visit_occurrence_id,
 )
@@ -15,6 +15,16 @@ logging.basicConfig(
 )
 
 
+def format_nd_status(nd_values):
+    """Status text of a ___nd variable: BLANK, 0 (tested), 1 (not tested) or <n> (unknown)"""
+    status = pd.Series("BLANK", index=nd_values.index, dtype=object)
+    present = nd_values.notna()
+    status[present] = nd_values[present].astype(int).astype(str) + " (unknown)"
+    status[nd_values == 0] = "0 (tested)"
+    status[nd_values == 1] = "1 (not tested)"
+    return status
+
+
 def als_gene_mutations_to_measurement(source_df, index_date_str):
     """
     Transform ALS gene mutations data into OMOP measurement table format.
@@ -31,9 +41,6 @@ def als_gene_mutations_to_measurement(source_df, index_date_str):
     # Convert index date string to datetime
     index_date = datetime.strptime(index_date_str, "%Y-%m-%d")
 
-    # Initialize empty list to store transformed rows
-    transformed_rows = []
-
     # Define the mapping of test variables to measurement concepts and meanings
     gene_mappings = {
         "ang": {
@@ -104,74 +111,80 @@ def als_gene_mutations_to_measurement(source_df, index_date_str):
         },
     }
 
-    # Process each row in the source data
-    for _, row in source_df.iterrows():
-        person_id = row["Participant_ID"]
-        # Calculate visit date using relative_day_to_date and format as YYYY-MM-DD
-        visit_date = relative_day_to_date(row["Visit_Date"], index_date).strftime(
-            "%Y-%m-%d"
+    # One row per (source row, gene) with a meaningful result (1 = positive,
+    # 2 = negative). The stable sort on the source row index puts the records back
+    # in source row order, with the genes of each row in mapping order. Only the
+    # gene columns are melted (melt with no value_vars would melt every column)
+    source_df = source_df.reset_index(drop=True)
+    gene_columns = [test_var for test_var in gene_mappings if test_var in source_df.columns]
+    results = source_df[gene_columns].melt(
+        var_name="test_var",
+        value_name="result",
+        ignore_index=False,
+    )
+    results = results[results["result"].isin([1, 2])].sort_index(kind="stable")
+    rows = source_df.loc[results.index].reset_index(drop=True)
+    results = results.reset_index(drop=True)
+    test_vars = results["test_var"]
+    is_positive = (results["result"] == 1).to_numpy()
+
+    mapping_df = pd.DataFrame.from_dict(gene_mappings, orient="index")
+    gene_names = mapping_df["source_meaning"].str.replace(" Mutation", "", regex=False)
+
+    # Build source values using the new format: the ___nd variable status first
+    # (if the gene has one), then the test result, then the SOD1 mutation text
+    nd_parts = pd.Series("", index=results.index, dtype=object)
+    for test_var in gene_columns:
+        nd_var = gene_mappings[test_var]["nd_var"]
+        if nd_var is None:  # No proper nd variable for mutot
+            continue
+        is_gene = (test_vars == test_var).to_numpy()
+        if nd_var in source_df.columns:
+            nd_values = rows.loc[is_gene, nd_var]
+        else:
+            nd_values = pd.Series(None, index=rows.index[is_gene], dtype=float)
+        nd_parts[is_gene] = (
+            f"als_gene_mutations+{nd_var} ({gene_names[test_var]}): "
+            + format_nd_status(nd_values)
+            + " | "
         )
 
-        # Process each gene mutation
-        for test_var, mapping in gene_mappings.items():
-            if test_var not in row or pd.isna(row[test_var]):
-                continue
-
-            # Only create record if test_var has a meaningful result (1 = positive, 2 = negative)
-            if row[test_var] in [1, 2]:
-                # Get the text value for the test result
-                result_text = "Positive" if row[test_var] == 1 else "Negative"
-
-                # Build source values using the new format
-                source_parts = []
-                
-                # Add the ___nd variable status first (if it exists)
-                nd_var = mapping["nd_var"]
-                gene_name = mapping['source_meaning'].replace(' Mutation', '')
-                
-                if nd_var is not None:  # Only process nd_var if it exists
-                    if pd.isna(row.get(nd_var)):
-                        nd_status = "BLANK"
-                    elif row[nd_var] == 0:
-                        nd_status = "0 (tested)"
-                    elif row[nd_var] == 1:
-                        nd_status = "1 (not tested)"
-                    else:
-                        nd_status = f"{int(row[nd_var])} (unknown)"
-                    
-                    source_parts.append(f"als_gene_mutations+{nd_var} ({gene_name}): {nd_status}")
-                
-                # Add the test result
-                source_parts.append(f"als_gene_mutations+{test_var}: {int(row[test_var])} ({result_text})")
-                
-                # For SOD1, add the mutation text if available
-                if test_var == "sod1" and pd.notna(row.get("sod1muta")):
-                    source_parts.append(f"als_gene_mutations+sod1muta: {row['sod1muta']}")
-                
-                # Join the parts with ' | ' separator
-                value_source_value = " | ".join(source_parts)
-                
-                # For measurement_source_value, use the test variable with gene interpretation
-                gene_name = mapping['source_meaning'].replace(' Mutation', '')
-                measurement_source_value = f"als_gene_mutations+{test_var} ({gene_name})"
-
-                transformed_row = {
-                    "person_id": person_id,
-                    "measurement_concept_id": mapping["concept_id"],
-                    "measurement_source_value": measurement_source_value,
-                    "measurement_date": visit_date,
-                    "measurement_type_concept_id": 32851,  # Healthcare professional filled survey
-                    "value_as_number": None,
-                    "value_as_concept_id": (
-                        9191 if row[test_var] == 1 else 9189
-                    ),  # Positive or Negative
-                    "value_source_value": value_source_value,
-                    "visit_occurrence_id": f"{person_id}_{row['Visit_Date']}",  # Use unconverted Visit_Date
-                }
-                transformed_rows.append(transformed_row)
-
-    # Create DataFrame from transformed rows
-    result_df = pd.DataFrame(transformed_rows)
+    value_source_values = (
+        nd_parts
+        + "als_gene_mutations+"
+        + test_vars
+        + np.where(is_positive, ": 1 (Positive)", ": 2 (Negative)")
+    )
+    if "sod1muta" in source_df.columns:
+        has_sod1muta = (test_vars == "sod1") & rows["sod1muta"].notna()
+        sod1muta_text = rows.loc[has_sod1muta, "sod1muta"].astype(object).map(str)
+        value_source_values[has_sod1muta] += " | als_gene_mutations+sod1muta: " + sod1muta_text
+
+    # Visit dates from the relative Visit_Date, formatted as YYYY-MM-DD
+    measurement_dates = (
+        index_date + pd.to_timedelta(rows["Visit_Date"], unit="D")
+    ).dt.strftime("%Y-%m-%d")
+
+    result_df = pd.DataFrame(
+        {
+            "person_id": rows["Participant_ID"],
+            "measurement_concept_id": mapping_df["concept_id"].reindex(test_vars).to_numpy(),
+            # For measurement_source_value, use the test variable with gene interpretation
+            "measurement_source_value": "als_gene_mutations+"
+            + test_vars
+            + " ("
+            + gene_names.reindex(test_vars).to_numpy()
+            + ")",
+            "measurement_date": measurement_dates,
+            "measurement_type_concept_id": 32851,  # Healthcare professional filled survey
+            "value_as_concept_id": np.where(is_positive, 9191, 9189),  # Positive or Negative
+            "value_source_value": value_source_values,
+            # Use unconverted Visit_Date
+            "visit_occurrence_id": rows["Participant_ID"].astype(object).map(str)
+            + "_"
+            + rows["Visit_Date"].astype(object).map(str),
+        }
+    )
 
     # Check for missing concept IDs
     check_missing_concept_ids(result_df, "measurement_concept_id")
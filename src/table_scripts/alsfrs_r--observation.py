@@ -228,21 +228,36 @@ def process_alsfrs_r_to_observation(source_file, index_date):
             },
         }
 
-        # Process each row in the source data
-        for _, row in df.iterrows():
-            person_id = row["Participant_ID"]
-            visit_date = relative_day_to_date(row["alsfrsdt"], index_date)
+        # ALSFRS-R items present in the source data, with the parts of each
+        # observation that do not depend on the row
+        present_items = [
+            (
+                item,
+                concept_info["concept_id"],
+                f"alsfrs_r+{item} ({concept_info['variable_meaning']})",
+                concept_info["values"],
+            )
+            for item, concept_info in alsfrs_items.items()
+            if item in df.columns
+        ]
+
+        # Process each row in the source data. alsfrsdt is iterated as Python ints
+        # (and pd.NA), which relative_day_to_date and the visit id expect
+        for row in df.astype({"alsfrsdt": object}).itertuples(index=False, name="Row"):
+            person_id = row.Participant_ID
+            visit_date = relative_day_to_date(row.alsfrsdt, index_date)
             # Use raw date value for visit_occurrence_id
-            visit_occurrence_id = f"{person_id}_{row['alsfrsdt']}"
+            visit_occurrence_id = f"{person_id}_{row.alsfrsdt}"
 
             # Process each ALSFRS-R item
-            for item, concept_info in alsfrs_items.items():
-                if item in row and pd.notna(row[item]):
+            for item, concept_id, observation_source_value, values in present_items:
+                item_value = getattr(row, item)
+                if pd.notna(item_value):
                     # Convert to integer
-                    value = int(row[item])
-                    
+                    value = int(item_value)
+
                     # Format value source using new format: table+var: value (interpretation)
-                    value_description = concept_info["values"].get(value, "")
+                    value_description = values.get(value, "")
                     if value_description:
                         value_source = f"alsfrs_r+{item}: {value} ({value_description})"
                     else:
@@ -250,8 +265,8 @@ def process_alsfrs_r_to_observation(source_file, index_date):
 
                     observation = {
                         "person_id": person_id,
-                        "observation_concept_id": concept_info["concept_id"],
-                        "observation_source_value": f"alsfrs_r+{item} ({concept_info['variable_meaning']})",
+                        "observation_concept_id": concept_id,
+                        "observation_source_value": observation_source_value,
                         "observation_date": visit_date,
                         "observation_type_concept_id": 32851,  # Healthcare professional filled survey
                         "value_as_number": value,
@@ -300,10 +315,14 @@ def process_alsfrs_r_to_observation(source_file, index_date):
         raise
 
 
-if __name__ == "__main__":
+def main():
     # Set index date (example: 2016-01-01)
     index_date = datetime(2016, 1, 1)
 
     # Process the data
     source_file = "source_tables/alsfrs_r.csv"
     process_alsfrs_r_to_observation(source_file, index_date)
+
+
+if __name__ == "__main__":
+    main()
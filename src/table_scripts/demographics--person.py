@@ -259,5 +259,9 @@ def process_demographics_to_person():
         raise
 
 
-if __name__ == "__main__":
+def main():
     process_demographics_to_person()
+
+
+if __name__ == "__main__":
+    main()